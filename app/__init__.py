@@ -2,33 +2,12 @@ import os
 from flask import Flask
 from .extensions import db, migrate, login_manager
 from .models import User  # import models for migrations
-import re
-from flask import Flask, url_for
-from markupsafe import Markup
+from . import rendering, tasks, uploads, upsert, user_cache
 from .auth.routes import auth_bp
 from .main.routes import main_bp
 
 def create_app():
     app = Flask(__name__)
-     
-        # --- Hashtag link filter for Jinja ---
-    def link_hashtags(text: str) -> str:
-        if not text:
-            return ""
-        pattern = r"#(\w+)"
-        def repl(match):
-            tag = match.group(1)
-            try:
-                url = url_for("tags.view_tag", tag=tag.lower())
-            except Exception:
-                # If tags blueprint not ready yet, just return plain text hashtag
-                return f"#{tag}"
-            return f'<a href="{url}" class="hashtag-link">#{tag}</a>'
-        return Markup(re.sub(pattern, repl, text))
-
-    app.jinja_env.filters["link_hashtags"] = link_hashtags
-    # --- end hashtag filter ---
-
 
     # Basic config
     app.config['SECRET_KEY'] = os.environ.get("SECRET_KEY", "change-this-secret")
@@ -41,17 +20,34 @@ def create_app():
     os.makedirs(upload_folder, exist_ok=True)
     app.config['UPLOAD_FOLDER'] = upload_folder
 
+    # Media hand-off to the web server: None, "x-sendfile" or "x-accel-redirect"
+    # (nginx needs an internal location at MEDIA_ACCEL_PREFIX aliasing the folder)
+    app.config['MEDIA_ACCEL'] = os.environ.get("MEDIA_ACCEL") or None
+    app.config['MEDIA_ACCEL_PREFIX'] = os.environ.get("MEDIA_ACCEL_PREFIX", "/_media/")
+
+    # Swipe quota counting: "db" (exact, one upsert per like) or "memory"
+    # (per-worker buckets flushed every few seconds), see app/quota.py
+    app.config['SWIPE_QUOTA_MODE'] = os.environ.get("SWIPE_QUOTA_MODE", "db")
+
     # Razorpay key for frontend
     app.config['RAZORPAY_KEY_ID'] = os.environ.get("RAZORPAY_KEY_ID", "rzp_test_yourkeyid")
 
     # Init extensions
+    upsert.init_app(app)  # PostgreSQL or SQLite only
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
+    # Jinja filters: link_hashtags, render_post (cached post bodies)
+    rendering.init_app(app)
+
+    # Upload size limit and the media_url() template helper
+    uploads.init_app(app)
+
+    # Cached per worker, see app/user_cache.py
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load_user(int(user_id))
 
     login_manager.login_view = "auth.login"
 
@@ -66,6 +62,7 @@ def create_app():
     from .stories.routes import stories_bp
     from .gossip.routes import gossip_bp
     from .admin import admin_bp
+    from .media import media_bp
 
     app.register_blueprint(stories_bp)
     app.register_blueprint(gossip_bp)
@@ -77,5 +74,9 @@ def create_app():
     app.register_blueprint(chat_bp)
     app.register_blueprint(billing_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(media_bp)
+
+    # Periodic jobs (story reaper, hot score refresh) when RUN_BACKGROUND_TASKS=1
+    tasks.init_app(app)
 
     return app
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
-from . import routes  # noqa
+from . import routes, commands  # noqa
@@ -0,0 +1,168 @@
+from sqlalchemy import select, update, delete
+
+from ..extensions import db
+from ..gossip.feed_cache import bump_generation
+from ..hashtags import release_hashtags
+from ..models import Gossip, Post, Report, User, post_hashtags
+from ..profiles.search import reindex_users
+from ..stats import POSTS, REPORTS_OPEN, USERS_BANNED, bump
+from ..user_cache import invalidate_user
+
+
+# Set-based moderation: every action is a handful of UPDATE / DELETE
+# statements over the selected rows, committed as one transaction, whatever
+# the number of rows. Bulk statements bypass the ORM's mapper events, so the
+# stats counters and caches those would have updated are maintained here
+# explicitly.
+
+
+def _where(model, ids, conditions):
+    clauses = list(conditions)
+    if ids is not None:
+        clauses.append(model.id.in_(ids))
+    return clauses
+
+
+def _update(model, clauses, **values):
+    return db.session.execute(
+        update(model)
+        .where(*clauses)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _resolve_reports(column, target_ids, admin_id) -> int:
+    """Resolve the open reports of the given targets; returns how many."""
+    if not target_ids:
+        return 0
+    resolved = _update(
+        Report,
+        [column.in_(target_ids), Report.resolved.is_(False)],
+        resolved=True,
+        resolved_by_id=admin_id,
+    ).rowcount
+    if resolved:
+        bump(REPORTS_OPEN, -resolved, daily=False)
+    return resolved
+
+
+def _commit(counts: dict) -> dict:
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts
+
+
+# -------------------------------------------------
+# Users
+# -------------------------------------------------
+def set_banned(ids, conditions, banned: bool) -> dict:
+    """Ban / unban the selected users. Admins are never banned."""
+    clauses = _where(User, ids, conditions)
+    if banned:
+        clauses += [User.is_banned.isnot(True), User.is_admin.isnot(True)]
+    else:
+        clauses.append(User.is_banned.is_(True))
+
+    changed = [
+        row[0]
+        for row in db.session.execute(
+            update(User)
+            .where(*clauses)
+            .values(is_banned=banned)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+    ]
+    if changed:
+        bump(USERS_BANNED, len(changed) if banned else -len(changed), daily=False)
+    counts = _commit({"users": len(changed)})
+
+    for user_id in changed:
+        invalidate_user(user_id)
+    reindex_users(changed)
+    return counts
+
+
+# -------------------------------------------------
+# Posts
+# -------------------------------------------------
+def delete_posts(ids, conditions, admin_id) -> dict:
+    """
+    Delete the selected posts with their hashtag links. Their open reports
+    are resolved, and every report is detached from the deleted post.
+    """
+    post_ids = list(db.session.scalars(select(Post.id).where(*_where(Post, ids, conditions))))
+    if not post_ids:
+        return {"posts": 0, "reports_resolved": 0}
+
+    release_hashtags(post_ids)
+    db.session.execute(delete(post_hashtags).where(post_hashtags.c.post_id.in_(post_ids)))
+    resolved = _resolve_reports(Report.post_id, post_ids, admin_id)
+    _update(Report, [Report.post_id.in_(post_ids)], post_id=None)
+    deleted = db.session.execute(
+        delete(Post)
+        .where(Post.id.in_(post_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    bump(POSTS, -deleted, daily=False)
+    return _commit({"posts": deleted, "reports_resolved": resolved})
+
+
+def set_post_featured(ids, conditions, featured: bool) -> dict:
+    clauses = _where(Post, ids, conditions)
+    clauses.append(Post.is_featured.isnot(True) if featured else Post.is_featured.is_(True))
+    return _commit({"posts": _update(Post, clauses, is_featured=featured).rowcount})
+
+
+# -------------------------------------------------
+# Gossips
+# -------------------------------------------------
+def delete_gossips(ids, conditions, admin_id) -> dict:
+    """Soft-delete the selected gossips and resolve their open reports."""
+    clauses = _where(Gossip, ids, conditions) + [Gossip.is_deleted.isnot(True)]
+    gossip_ids = [
+        row[0]
+        for row in db.session.execute(
+            update(Gossip)
+            .where(*clauses)
+            .values(is_deleted=True)
+            .returning(Gossip.id)
+            .execution_options(synchronize_session=False)
+        )
+    ]
+    resolved = _resolve_reports(Report.gossip_id, gossip_ids, admin_id)
+    if gossip_ids:
+        bump_generation()
+    return _commit({"gossips": len(gossip_ids), "reports_resolved": resolved})
+
+
+def restore_gossips(ids, conditions) -> dict:
+    clauses = _where(Gossip, ids, conditions) + [Gossip.is_deleted.is_(True)]
+    restored = _update(Gossip, clauses, is_deleted=False).rowcount
+    if restored:
+        bump_generation()
+    return _commit({"gossips": restored})
+
+
+def set_gossip_featured(ids, conditions, featured: bool) -> dict:
+    clauses = _where(Gossip, ids, conditions)
+    clauses.append(Gossip.is_featured.isnot(True) if featured else Gossip.is_featured.is_(True))
+    changed = _update(Gossip, clauses, is_featured=featured).rowcount
+    if changed:
+        bump_generation()
+    return _commit({"gossips": changed})
+
+
+# -------------------------------------------------
+# Reports
+# -------------------------------------------------
+def resolve_reports(ids, conditions, admin_id) -> dict:
+    clauses = _where(Report, ids, conditions) + [Report.resolved.is_(False)]
+    resolved = _update(Report, clauses, resolved=True, resolved_by_id=admin_id).rowcount
+    if resolved:
+        bump(REPORTS_OPEN, -resolved, daily=False)
+    return _commit({"reports_resolved": resolved})
@@ -0,0 +1,19 @@
+import click
+
+from . import admin_bp
+from ..stats import rebuild_stats
+from .queue import backfill_resolved
+
+
+@admin_bp.cli.command("backfill-stats")
+def backfill_stats_command():
+    """Rebuild the dashboard counters from the base tables."""
+    totals = rebuild_stats()
+    for metric, value in sorted(totals.items()):
+        click.echo(f"{metric}: {value}")
+
+
+@admin_bp.cli.command("backfill-reports")
+def backfill_reports_command():
+    """Mark reports with resolved = NULL as open (run before making the column NOT NULL)."""
+    click.echo(f"Backfilled {backfill_resolved()} reports.")
@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func, or_
+
+from ..models import Gossip, Post, Report, User
+from ..subscriptions import PLANS
+
+
+# Filters the directory and bulk endpoints accept, per target. Each builder
+# takes a mapping (request.args or a JSON object) and returns
+# (SQL conditions, the filters that were applied as strings).
+USER_FILTERS = ("q", "banned", "admin", "plan", "branch", "year", "joined_from", "joined_to")
+POST_FILTERS = ("q", "user_id", "featured", "created_from", "created_to")
+GOSSIP_FILTERS = ("q", "category", "user_id", "featured", "deleted", "created_from", "created_to")
+REPORT_FILTERS = ("q", "post_id", "gossip_id", "reporter_id", "resolved", "created_from", "created_to")
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _flag(value):
+    return {"yes": True, "no": False}.get(value)
+
+
+def _date_arg(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(args, key) -> str:
+    value = args.get(key)
+    return str(value).strip() if value is not None else ""
+
+
+def _contains(args, columns, conditions, applied):
+    q = _text(args, "q")
+    if q:
+        pattern = _like_pattern(q)
+        conditions.append(or_(*(func.lower(c).like(pattern, escape="\\") for c in columns)))
+        applied["q"] = q
+
+
+def _flags(args, flags, conditions, applied):
+    for arg, column in flags:
+        flag = _flag(args.get(arg))
+        if flag is True:
+            conditions.append(column.is_(True))
+        elif flag is False:
+            conditions.append(or_(column.is_(False), column.is_(None)))
+        if flag is not None:
+            applied[arg] = args[arg]
+
+
+def _ids(args, columns, conditions, applied):
+    for arg, column in columns:
+        try:
+            value = int(args.get(arg) or 0)
+        except (TypeError, ValueError):
+            continue
+        if value:
+            conditions.append(column == value)
+            applied[arg] = str(value)
+
+
+def _date_range(args, column, conditions, applied, prefix="created"):
+    start = _date_arg(args.get(f"{prefix}_from"))
+    if start:
+        conditions.append(column >= start)
+        applied[f"{prefix}_from"] = start.isoformat()
+    end = _date_arg(args.get(f"{prefix}_to"))
+    if end:
+        conditions.append(column < end + timedelta(days=1))
+        applied[f"{prefix}_to"] = end.isoformat()
+
+
+def user_filters(args):
+    conditions, applied = [], {}
+    _contains(args, (User.name, User.email), conditions, applied)
+    _flags(args, (("banned", User.is_banned), ("admin", User.is_admin)), conditions, applied)
+
+    plan = args.get("plan")
+    if plan in PLANS:
+        conditions.append(User.plan == plan)
+        applied["plan"] = plan
+
+    for arg, column in (("branch", User.branch), ("year", User.year)):
+        value = _text(args, arg)
+        if value:
+            conditions.append(column == value)
+            applied[arg] = value
+
+    _date_range(args, User.created_at, conditions, applied, prefix="joined")
+    return conditions, applied
+
+
+def post_filters(args):
+    conditions, applied = [], {}
+    _contains(args, (Post.text,), conditions, applied)
+    _ids(args, (("user_id", Post.user_id),), conditions, applied)
+    _flags(args, (("featured", Post.is_featured),), conditions, applied)
+    _date_range(args, Post.created_at, conditions, applied)
+    return conditions, applied
+
+
+def gossip_filters(args):
+    conditions, applied = [], {}
+    _contains(args, (Gossip.text,), conditions, applied)
+    category = _text(args, "category")
+    if category:
+        conditions.append(Gossip.category == category)
+        applied["category"] = category
+    _ids(args, (("user_id", Gossip.created_by_user_id),), conditions, applied)
+    _flags(args, (("featured", Gossip.is_featured), ("deleted", Gossip.is_deleted)),
+           conditions, applied)
+    _date_range(args, Gossip.created_at, conditions, applied)
+    return conditions, applied
+
+
+def report_filters(args):
+    conditions, applied = [], {}
+    _contains(args, (Report.reason,), conditions, applied)
+    _ids(
+        args,
+        (
+            ("post_id", Report.post_id),
+            ("gossip_id", Report.gossip_id),
+            ("reporter_id", Report.reporter_id),
+        ),
+        conditions,
+        applied,
+    )
+    _flags(args, (("resolved", Report.resolved),), conditions, applied)
+    _date_range(args, Report.created_at, conditions, applied)
+    return conditions, applied
@@ -0,0 +1,108 @@
+from sqlalchemy import func, literal, select, union_all, update
+
+from ..extensions import db
+from ..models import Gossip, Post, Report
+
+
+TARGET_KINDS = ("post", "gossip")
+
+# Most common reasons shown per target
+TOP_REASONS = 3
+
+
+class QueueEntry:
+    """One reported post or gossip with the aggregate of its open reports."""
+
+    __slots__ = ("kind", "target_id", "reports", "reporters", "first_at", "last_at",
+                 "target", "reasons")
+
+    def __init__(self, kind, target_id, reports, reporters, first_at, last_at):
+        self.kind = kind
+        self.target_id = target_id
+        self.reports = reports
+        self.reporters = reporters  # distinct reporters
+        self.first_at = first_at
+        self.last_at = last_at
+        self.target = None          # the Post / Gossip, None if gone
+        self.reasons = []           # [(reason, count)] most common first
+
+
+def _column(kind):
+    return Report.post_id if kind == "post" else Report.gossip_id
+
+
+def _open_groups(kind):
+    # resolved IS false (the column is NOT NULL) so the (resolved, target)
+    # indexes serve both the filter and the grouping
+    column = _column(kind)
+    return (
+        select(
+            literal(kind).label("kind"),
+            column.label("target_id"),
+            func.count().label("reports"),
+            func.count(Report.reporter_id.distinct()).label("reporters"),
+            func.min(Report.created_at).label("first_at"),
+            func.max(Report.created_at).label("last_at"),
+        )
+        .where(Report.resolved.is_(False), column.isnot(None))
+        .group_by(column)
+    )
+
+
+def backfill_resolved() -> int:
+    """Set resolved = false on reports filed before the column was NOT NULL."""
+    updated = db.session.execute(
+        update(Report)
+        .where(Report.resolved.is_(None))
+        .values(resolved=False)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return updated
+
+
+def report_queue(kind: str | None, page: int, per_page: int):
+    """
+    Open reports grouped by target, highest priority first: most distinct
+    reporters, then most reports, then most recently reported. `kind`
+    limits the queue to posts or gossips.
+
+    Returns (entries, has_next) for the 1-based `page`.
+    """
+    kinds = [kind] if kind in TARGET_KINDS else list(TARGET_KINDS)
+    groups = union_all(*(_open_groups(k) for k in kinds)).subquery()
+    rows = db.session.execute(
+        select(groups)
+        .order_by(groups.c.reporters.desc(), groups.c.reports.desc(), groups.c.last_at.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page + 1)
+    ).all()
+
+    has_next = len(rows) > per_page
+    entries = [QueueEntry(*row) for row in rows[:per_page]]
+    _attach_targets(entries)
+    return entries, has_next
+
+
+def _attach_targets(entries):
+    """Fill in targets and top reasons: two queries per kind on the page."""
+    for kind, model in (("post", Post), ("gossip", Gossip)):
+        page_entries = {e.target_id: e for e in entries if e.kind == kind}
+        if not page_entries:
+            continue
+        ids = list(page_entries)
+        for target in model.query.filter(model.id.in_(ids)):
+            page_entries[target.id].target = target
+
+        column = _column(kind)
+        n = func.count().label("n")
+        reasons = (
+            db.session.query(column, Report.reason, n)
+            .filter(Report.resolved.is_(False), column.in_(ids))
+            .group_by(column, Report.reason)
+            .order_by(n.desc())
+        )
+        for target_id, reason, count in reasons:
+            entry = page_entries[target_id]
+            if len(entry.reasons) < TOP_REASONS:
+                entry.reasons.append((reason or "Not specified", count))
@@ -1,10 +1,42 @@
-from flask import render_template, redirect, url_for, flash, request
+from datetime import date, timedelta
+
+from flask import render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import current_user, login_required
-from sqlalchemy import func
 
-from . import admin_bp
+from . import admin_bp, bulk
+from .filters import (
+    GOSSIP_FILTERS,
+    POST_FILTERS,
+    REPORT_FILTERS,
+    USER_FILTERS,
+    gossip_filters,
+    post_filters,
+    report_filters,
+    user_filters,
+)
+from .queue import TARGET_KINDS, report_queue
 from ..extensions import db
+from ..gossip.feed_cache import bump_generation, cache_stats as gossip_feed_stats
 from ..models import User, Post, Gossip, Report, Event
+from ..hashtags import attach_hashtags, release_hashtags
+from ..profiles.search import reindex_user
+from ..rendering import cache_stats as post_cache_stats
+from ..subscriptions import PLANS
+from ..stats import METRICS, daily_series, day_range, totals as stat_totals
+from ..user_cache import invalidate_user, cache_stats as user_cache_stats
+
+
+# Dashboard date range: default length, and the longest one served
+STATS_DEFAULT_DAYS = 30
+STATS_MAX_DAYS = 366
+
+USERS_PAGE_SIZE = 50
+
+# Reported targets per page of the moderation queue
+REPORT_QUEUE_PAGE_SIZE = 25
+
+# Explicit ids accepted by one bulk moderation request
+BULK_MAX_IDS = 1000
 
 
 def admin_required(f):
@@ -25,32 +57,74 @@ def admin_required(f):
 @login_required
 @admin_required
 def dashboard():
-    user_count = User.query.count()
-    post_count = Post.query.count()
-    gossip_count = Gossip.query.count()
-    report_open_count = Report.query.filter_by(resolved=False).count()
-    event_count = Event.query.count()
-
-    # Simple analytics: last 7 days posts
-    post_stats = (
-        db.session.query(
-            func.date(Post.created_at).label("day"),
-            func.count(Post.id)
-        )
-        .group_by(func.date(Post.created_at))
-        .order_by(func.date(Post.created_at).desc())
-        .limit(7)
-        .all()
-    )
+    # Totals and daily series come from the stats rollup (app/stats.py),
+    # never from COUNT(*) over the base tables
+    start, end = _stats_range()
+    metric = request.args.get("metric", "posts")
+    if metric not in METRICS:
+        metric = "posts"
+
+    series = daily_series(start, end)
+    days = day_range(start, end)
 
     return render_template(
         "admin/dashboard.html",
-        user_count=user_count,
-        post_count=post_count,
-        gossip_count=gossip_count,
-        report_open_count=report_open_count,
-        event_count=event_count,
-        post_stats=post_stats,
+        totals=stat_totals(),
+        metrics=METRICS,
+        series=series,
+        days=days,
+        chart_metric=metric,
+        chart_max=max(series[metric] + [1]),
+        start=start,
+        end=end,
+    )
+
+
+def _stats_range():
+    """?start=&end= (YYYY-MM-DD, inclusive), default the last 30 days."""
+    today = date.today()
+    try:
+        end = date.fromisoformat(request.args.get("end", ""))
+    except ValueError:
+        end = today
+    try:
+        start = date.fromisoformat(request.args.get("start", ""))
+    except ValueError:
+        start = end - timedelta(days=STATS_DEFAULT_DAYS - 1)
+    if start > end:
+        start, end = end, start
+    # Bound the series a single request builds
+    start = max(start, end - timedelta(days=STATS_MAX_DAYS - 1))
+    return start, end
+
+
+@admin_bp.route("/stats.json")
+@login_required
+@admin_required
+def stats_json():
+    """Daily series for charts: {"days": [...], "series": {metric: [...]}}."""
+    start, end = _stats_range()
+    metrics = [m for m in request.args.getlist("metric") if m in METRICS] or list(METRICS)
+    return jsonify(
+        {
+            "days": [d.isoformat() for d in day_range(start, end)],
+            "series": daily_series(start, end, metrics),
+            "totals": stat_totals(),
+        }
+    )
+
+
+@admin_bp.route("/cache_stats")
+@login_required
+@admin_required
+def cache_stats():
+    """Hit / miss counters of this worker's in-process caches."""
+    return jsonify(
+        {
+            "users": user_cache_stats(),
+            "post_bodies": post_cache_stats(),
+            "gossip_feed": gossip_feed_stats(),
+        }
     )
 
 
@@ -59,8 +133,33 @@ def dashboard():
 @login_required
 @admin_required
 def users():
-    users = User.query.order_by(User.id.desc()).all()
-    return render_template("admin/users.html", users=users)
+    """
+    Paginated user directory, newest first. Filters come from the query
+    string (see filters.user_filters); pages continue from ?before=<id>, so every
+    page is an index range scan however deep it is.
+    """
+    conditions, filters = user_filters(request.args)
+    before = request.args.get("before", type=int)
+
+    query = User.query.filter(*conditions)
+    if before:
+        query = query.filter(User.id < before)
+    rows = query.order_by(User.id.desc()).limit(USERS_PAGE_SIZE + 1).all()
+
+    next_before = None
+    if len(rows) > USERS_PAGE_SIZE:
+        rows = rows[:USERS_PAGE_SIZE]
+        next_before = rows[-1].id
+
+    return render_template(
+        "admin/users.html",
+        users=rows,
+        filters=filters,
+        plans=list(PLANS),
+        totals=stat_totals(),
+        before=before,
+        next_before=next_before,
+    )
 
 
 @admin_bp.route("/ban_user/<int:user_id>")
@@ -73,8 +172,10 @@ def ban_user(user_id):
         return redirect(url_for("admin.users"))
     user.is_banned = True
     db.session.commit()
+    invalidate_user(user.id)
+    reindex_user(user)
     flash("User banned.", "warning")
-    return redirect(url_for("admin.users"))
+    return redirect(request.referrer or url_for("admin.users"))
 
 
 @admin_bp.route("/unban_user/<int:user_id>")
@@ -84,8 +185,10 @@ def unban_user(user_id):
     user = User.query.get_or_404(user_id)
     user.is_banned = False
     db.session.commit()
+    invalidate_user(user.id)
+    reindex_user(user)
     flash("User unbanned.", "success")
-    return redirect(url_for("admin.users"))
+    return redirect(request.referrer or url_for("admin.users"))
 
 
 # POSTS MANAGEMENT
@@ -102,6 +205,7 @@ def posts():
 @admin_required
 def delete_post(post_id):
     post = Post.query.get_or_404(post_id)
+    release_hashtags([post.id])
     db.session.delete(post)
     db.session.commit()
     flash("Post deleted.", "success")
@@ -145,6 +249,7 @@ def gossips():
 def delete_gossip(gossip_id):
     gossip = Gossip.query.get_or_404(gossip_id)
     gossip.is_deleted = True
+    bump_generation(gossip.category)
     db.session.commit()
     flash("Gossip marked as deleted.", "success")
     return redirect(url_for("admin.gossips"))
@@ -156,6 +261,7 @@ def delete_gossip(gossip_id):
 def feature_gossip(gossip_id):
     gossip = Gossip.query.get_or_404(gossip_id)
     gossip.is_featured = True
+    bump_generation(gossip.category)
     db.session.commit()
     flash("Gossip marked as featured.", "success")
     return redirect(url_for("admin.gossips"))
@@ -167,6 +273,7 @@ def feature_gossip(gossip_id):
 def unfeature_gossip(gossip_id):
     gossip = Gossip.query.get_or_404(gossip_id)
     gossip.is_featured = False
+    bump_generation(gossip.category)
     db.session.commit()
     flash("Gossip unfeatured.", "success")
     return redirect(url_for("admin.gossips"))
@@ -177,8 +284,54 @@ def unfeature_gossip(gossip_id):
 @login_required
 @admin_required
 def reports():
-    reports = Report.query.order_by(Report.created_at.desc()).all()
-    return render_template("admin/reports.html", reports=reports)
+    """Open reports grouped by the post or gossip they target, by priority."""
+    kind = request.args.get("type")
+    if kind not in TARGET_KINDS:
+        kind = None
+    page = max(request.args.get("page", 1, type=int), 1)
+    entries, has_next = report_queue(kind, page, REPORT_QUEUE_PAGE_SIZE)
+    return render_template(
+        "admin/reports.html",
+        entries=entries,
+        kind=kind,
+        page=page,
+        has_next=has_next,
+        open_reports=stat_totals()["reports_open"],
+    )
+
+
+def _target_filter(kind, target_id):
+    return [(Report.post_id if kind == "post" else Report.gossip_id) == target_id]
+
+
+@admin_bp.route("/reports/<kind>/<int:target_id>/resolve")
+@login_required
+@admin_required
+def resolve_target(kind, target_id):
+    """Close every open report of one post / gossip in one statement."""
+    if kind not in TARGET_KINDS:
+        abort(404)
+    counts = bulk.resolve_reports(None, _target_filter(kind, target_id), current_user.id)
+    flash(f"{counts['reports_resolved']} report(s) resolved.", "success")
+    return redirect(request.referrer or url_for("admin.reports"))
+
+
+@admin_bp.route("/reports/<kind>/<int:target_id>/delete")
+@login_required
+@admin_required
+def delete_target(kind, target_id):
+    """Remove a reported post / gossip and resolve all of its reports."""
+    if kind not in TARGET_KINDS:
+        abort(404)
+    if kind == "post":
+        counts = bulk.delete_posts([target_id], [], current_user.id)
+    else:
+        counts = bulk.delete_gossips([target_id], [], current_user.id)
+    flash(
+        f"{kind.capitalize()} removed, {counts['reports_resolved']} report(s) resolved.",
+        "success",
+    )
+    return redirect(request.referrer or url_for("admin.reports"))
 
 
 @admin_bp.route("/reports/resolve/<int:report_id>")
@@ -201,6 +354,7 @@ def reports_delete_post(report_id):
     if report.post_id:
         post = Post.query.get(report.post_id)
         if post:
+            release_hashtags([post.id])
             db.session.delete(post)
     report.resolved = True
     report.resolved_by_id = current_user.id
@@ -218,6 +372,7 @@ def reports_delete_gossip(report_id):
         gossip = Gossip.query.get(report.gossip_id)
         if gossip:
             gossip.is_deleted = True
+            bump_generation(gossip.category)
     report.resolved = True
     report.resolved_by_id = current_user.id
     db.session.commit()
@@ -225,6 +380,86 @@ def reports_delete_gossip(report_id):
     return redirect(url_for("admin.reports"))
 
 
+# BULK MODERATION
+# POST /admin/bulk/<target>/<action> with JSON {"ids": [...], "filter": {...}}
+# or form fields ids=... plus filter fields. Rows must match both when both
+# are given; at least one of them is required.
+_BULK_ACTIONS = {
+    ("users", "ban"): lambda ids, where: bulk.set_banned(ids, where, True),
+    ("users", "unban"): lambda ids, where: bulk.set_banned(ids, where, False),
+    ("posts", "delete"): lambda ids, where: bulk.delete_posts(ids, where, current_user.id),
+    ("posts", "feature"): lambda ids, where: bulk.set_post_featured(ids, where, True),
+    ("posts", "unfeature"): lambda ids, where: bulk.set_post_featured(ids, where, False),
+    ("gossips", "delete"): lambda ids, where: bulk.delete_gossips(ids, where, current_user.id),
+    ("gossips", "restore"): lambda ids, where: bulk.restore_gossips(ids, where),
+    ("gossips", "feature"): lambda ids, where: bulk.set_gossip_featured(ids, where, True),
+    ("gossips", "unfeature"): lambda ids, where: bulk.set_gossip_featured(ids, where, False),
+    ("reports", "resolve"): lambda ids, where: bulk.resolve_reports(ids, where, current_user.id),
+}
+
+_BULK_FILTERS = {
+    "users": (USER_FILTERS, user_filters),
+    "posts": (POST_FILTERS, post_filters),
+    "gossips": (GOSSIP_FILTERS, gossip_filters),
+    "reports": (REPORT_FILTERS, report_filters),
+}
+
+
+def _bulk_error(message, status=400):
+    return jsonify({"ok": False, "error": message}), status
+
+
+def _bulk_input(allowed):
+    """(ids or None, filter dict) from a JSON body or form fields."""
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        ids = payload.get("ids")
+        raw_filter = payload.get("filter") or {}
+    else:
+        ids = [part for value in request.form.getlist("ids") for part in value.split(",")]
+        raw_filter = {key: request.form[key] for key in allowed if request.form.get(key)}
+
+    if not isinstance(raw_filter, dict):
+        raise ValueError("filter must be an object")
+    unknown = sorted(set(raw_filter) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown filter: {', '.join(unknown)}")
+
+    if not ids:
+        return None, raw_filter
+    if not isinstance(ids, list):
+        raise ValueError("ids must be a list")
+    try:
+        ids = sorted({int(i) for i in ids})
+    except (TypeError, ValueError):
+        raise ValueError("ids must be integers")
+    if len(ids) > BULK_MAX_IDS:
+        raise ValueError(f"At most {BULK_MAX_IDS} ids per request")
+    return ids, raw_filter
+
+
+@admin_bp.route("/bulk/<target>/<action>", methods=["POST"])
+@login_required
+@admin_required
+def bulk_action(target, action):
+    run = _BULK_ACTIONS.get((target, action))
+    if run is None:
+        return _bulk_error("Unknown bulk action", 404)
+    allowed, build_filters = _BULK_FILTERS[target]
+
+    try:
+        ids, raw_filter = _bulk_input(allowed)
+    except ValueError as e:
+        return _bulk_error(str(e))
+    conditions, applied = build_filters(raw_filter)
+    if ids is None and not applied:
+        # Never let an empty or unusable filter select the whole table
+        return _bulk_error("Give ids or at least one valid filter")
+
+    counts = run(ids, conditions)
+    return jsonify({"ok": True, "target": target, "action": action, "filter": applied, **counts})
+
+
 # EVENTS (ADMIN ONLY)
 @admin_bp.route("/events/new", methods=["GET", "POST"])
 @login_required
@@ -282,6 +517,8 @@ def create_announcement():
             is_featured=True
         )
         db.session.add(post)
+        db.session.flush()
+        attach_hashtags(post)
         db.session.commit()
         flash("Announcement posted and featured.", "success")
         return redirect(url_for("admin.dashboard"))
@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from . import auth_bp
 from ..models import User
 from ..extensions import db
+from ..profiles.search import reindex_user
 
 
 @auth_bp.route("/login", methods=["GET", "POST"])
@@ -52,6 +53,7 @@ def register():
         user.set_password(password)
         db.session.add(user)
         db.session.commit()
+        reindex_user(user)
         flash("Account created. Please log in.", "success")
         return redirect(url_for("auth.login"))
 
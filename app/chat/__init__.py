@@ -2,4 +2,4 @@ from flask import Blueprint
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
 
-from . import routes  # noqa
+from . import routes, commands  # noqa
@@ -0,0 +1,10 @@
+import click
+
+from . import chat_bp
+from .inbox import backfill_inbox
+
+
+@chat_bp.cli.command("backfill-inbox")
+def backfill_inbox_command():
+    """Fill in last activity and previews of matches made before the inbox columns."""
+    click.echo(f"Backfilled the inbox state of {backfill_inbox()} matches.")
@@ -0,0 +1,148 @@
+from sqlalchemy import func, select, union_all, update
+
+from ..extensions import db
+from ..models import Match, Message, User
+
+
+PREVIEW_LENGTH = 140
+
+
+def _side(match: Match, user_id: int) -> int:
+    return 1 if match.user1_id == user_id else 2
+
+
+def record_message(match: Match, msg: Message):
+    """
+    Fold a new message into the match's inbox state with one UPDATE in the
+    sender's transaction: last activity and preview, the recipient's unread
+    count +1, and the sender's read cursor moved past their own message.
+    msg must be flushed (have an id).
+    """
+    sender_side = _side(match, msg.sender_id)
+    other_side = 2 if sender_side == 1 else 1
+    other_unread = getattr(Match, f"user{other_side}_unread")
+
+    db.session.execute(
+        update(Match)
+        .where(Match.id == match.id)
+        .values({
+            Match.last_message_at: msg.created_at,
+            Match.last_message_preview: msg.text[:PREVIEW_LENGTH],
+            Match.last_message_sender_id: msg.sender_id,
+            other_unread: other_unread + 1,
+            getattr(Match, f"user{sender_side}_last_read_id"): msg.id,
+            getattr(Match, f"user{sender_side}_unread"): 0,
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+
+def mark_read(match: Match, user_id: int, last_id: int):
+    """
+    Move user_id's read cursor to last_id. Their unread count becomes the
+    number of the other person's messages still after it, so a message
+    that lands while the page is being rendered stays unread. The count is
+    a range read on the (match_id, id) index.
+    """
+    side = _side(match, user_id)
+    read_col = getattr(Match, f"user{side}_last_read_id")
+    still_unread = (
+        select(func.count(Message.id))
+        .where(
+            Message.match_id == match.id,
+            Message.id > last_id,
+            Message.sender_id != user_id,
+        )
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(Match)
+        .where(Match.id == match.id, read_col < last_id)
+        .values({read_col: last_id, getattr(Match, f"user{side}_unread"): still_unread})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _side_branch(user_id: int, side: int, limit: int):
+    """
+    The user's newest `limit` matches where they are userN: one ordered
+    walk of the (userN_id, last_message_at, id) index.
+    """
+    own = getattr(Match, f"user{side}_id")
+    other = getattr(Match, f"user{2 if side == 1 else 1}_id")
+    return (
+        select(
+            Match.id.label("match_id"),
+            Match.last_message_at.label("last_message_at"),
+            other.label("other_id"),
+            getattr(Match, f"user{side}_unread").label("unread"),
+        )
+        .where(own == user_id)
+        .order_by(Match.last_message_at.desc(), Match.id.desc())
+        .limit(limit)
+        .subquery()
+    )
+
+
+def inbox(user_id: int, limit: int = 100):
+    """
+    The user's matches, most recent activity first, with the other person's
+    name and photo and the user's unread count, in one query: a UNION ALL
+    of the newest `limit` matches from each side (each an ordered index
+    walk), merged and cut to `limit`, then joined to Match and User.
+    Returns rows of (Match, other_id, other_name, other_photo, unread).
+    """
+    branches = [_side_branch(user_id, side, limit) for side in (1, 2)]
+    recent = union_all(*(select(branch) for branch in branches)).subquery()
+
+    return (
+        db.session.query(
+            Match,
+            User.id.label("other_id"),
+            User.name.label("other_name"),
+            User.photo.label("other_photo"),
+            recent.c.unread.label("unread"),
+        )
+        .select_from(recent)
+        .join(Match, Match.id == recent.c.match_id)
+        .join(User, User.id == recent.c.other_id)
+        .order_by(recent.c.last_message_at.desc(), recent.c.match_id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def backfill_inbox() -> int:
+    """
+    Fill in the inbox state of matches from before it existed (those with
+    no last_message_at), in one UPDATE: last activity and preview from the
+    newest message, or the match time if there is none, and the history
+    counted as read by both sides. Returns the number of matches updated.
+    """
+    newest_id = (
+        select(func.max(Message.id))
+        .where(Message.match_id == Match.id)
+        .correlate(Match)
+        .scalar_subquery()
+    )
+
+    def newest(column):
+        return select(column).where(Message.id == newest_id).scalar_subquery()
+
+    read_up_to = func.coalesce(newest_id, 0)
+    updated = db.session.execute(
+        update(Match)
+        .where(Match.last_message_at.is_(None))
+        .values({
+            Match.last_message_at: func.coalesce(newest(Message.created_at), Match.created_at),
+            Match.last_message_preview: newest(func.substr(Message.text, 1, PREVIEW_LENGTH)),
+            Match.last_message_sender_id: newest(Message.sender_id),
+            Match.user1_last_read_id: read_up_to,
+            Match.user2_last_read_id: read_up_to,
+            Match.user1_unread: 0,
+            Match.user2_unread: 0,
+        })
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return updated
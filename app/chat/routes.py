@@ -1,17 +1,81 @@
-from flask import render_template, redirect, url_for, request, flash
+import json
+import threading
+import time
+
+from flask import (
+    render_template, redirect, url_for, request, flash, jsonify,
+    Response, stream_with_context, abort,
+)
 from flask_login import login_required, current_user
 from . import chat_bp
 from ..models import Match, Message, User
 from ..extensions import db
+from .inbox import inbox, mark_read, record_message
+
+
+# SSE connections are closed after this long and re-opened by the browser
+# (EventSource reconnects on its own, resuming from Last-Event-ID), so a
+# worker is never held by a single client indefinitely.
+STREAM_SECONDS = 25
+# How often a stream checks the database for messages sent via other workers
+POLL_SECONDS = 1.0
+# Messages pushed per database check
+STREAM_BATCH = 100
+# Messages shown when a chat opens, and per "load older" page
+HISTORY_PAGE_SIZE = 50
+
+# Woken on every send in this process, so same-worker messages are pushed
+# immediately instead of on the next poll
+_new_message = threading.Condition()
+
+
+def _message_json(msg: Message) -> dict:
+    return {
+        "id": msg.id,
+        "sender_id": msg.sender_id,
+        "text": msg.text,
+        "time": msg.created_at.strftime("%H:%M"),
+    }
+
+
+def _match_or_403(match_id: int) -> Match:
+    match = Match.query.get_or_404(match_id)
+    if current_user.id not in (match.user1_id, match.user2_id):
+        abort(403)
+    return match
+
+
+def _history(match_id: int, before_id: int | None = None):
+    """
+    Newest HISTORY_PAGE_SIZE messages of a match (older than before_id, if
+    given), oldest first. Reads one (match_id, id) index range, so the cost
+    doesn't depend on how long the conversation is.
+    Returns (messages, has_older).
+    """
+    query = Message.query.filter(Message.match_id == match_id)
+    if before_id:
+        query = query.filter(Message.id < before_id)
+    rows = query.order_by(Message.id.desc()).limit(HISTORY_PAGE_SIZE + 1).all()
+    has_older = len(rows) > HISTORY_PAGE_SIZE
+    return rows[:HISTORY_PAGE_SIZE][::-1], has_older
+
+
+def _send(match: Match, text: str) -> Message:
+    msg = Message(match_id=match.id, sender_id=current_user.id, text=text)
+    db.session.add(msg)
+    db.session.flush()
+    record_message(match, msg)
+    db.session.commit()
+    with _new_message:
+        _new_message.notify_all()
+    return msg
 
 
 @chat_bp.route("/")
 @login_required
 def matches():
-    matches = Match.query.filter(
-        (Match.user1_id == current_user.id) | (Match.user2_id == current_user.id)
-    ).order_by(Match.created_at.desc()).all()
-    return render_template("chat/matches.html", matches=matches)
+    rows = inbox(current_user.id)
+    return render_template("chat/matches.html", rows=rows)
 
 
 @chat_bp.route("/room/<int:match_id>", methods=["GET", "POST"])
@@ -22,15 +86,106 @@ def chat_room(match_id):
         flash("Not allowed.", "danger")
         return redirect(url_for("chat.matches"))
 
+    # Plain form post, kept for browsers without JavaScript
     if request.method == "POST":
         text = request.form.get("text")
         if text:
-            msg = Message(match_id=match.id, sender_id=current_user.id, text=text)
-            db.session.add(msg)
-            db.session.commit()
+            _send(match, text)
         return redirect(url_for("chat.chat_room", match_id=match.id))
 
-    messages = Message.query.filter_by(match_id=match.id).order_by(Message.created_at.asc()).all()
+    messages, has_older = _history(match.id)
+    if messages:
+        mark_read(match, current_user.id, messages[-1].id)
+        db.session.commit()
     other_id = match.user1_id if match.user2_id == current_user.id else match.user2_id
     other = User.query.get(other_id)
-    return render_template("chat/chat.html", match=match, other=other, messages=messages)
+    return render_template(
+        "chat/chat.html",
+        match=match,
+        other=other,
+        messages=messages,
+        has_older=has_older,
+    )
+
+
+@chat_bp.route("/room/<int:match_id>/history")
+@login_required
+def history(match_id):
+    """AJAX "load older": the page of messages before ?before=<message id>."""
+    match = _match_or_403(match_id)
+    messages, has_older = _history(match.id, request.args.get("before", type=int))
+    return jsonify({
+        "messages": [_message_json(m) for m in messages],
+        "has_older": has_older,
+    })
+
+
+@chat_bp.route("/room/<int:match_id>/send", methods=["POST"])
+@login_required
+def send_message(match_id):
+    """
+    AJAX endpoint to post a message without reloading the page.
+    Accepts JSON {"text": ...} or a form field, returns the stored message.
+    """
+    match = _match_or_403(match_id)
+    payload = request.get_json(silent=True) or request.form
+    text = (payload.get("text") or "").strip()
+    if not text:
+        return jsonify({"ok": False, "error": "Message cannot be empty"}), 400
+
+    msg = _send(match, text)
+    return jsonify({"ok": True, "message": _message_json(msg)})
+
+
+@chat_bp.route("/room/<int:match_id>/stream")
+@login_required
+def stream(match_id):
+    """
+    Server-Sent Events stream of messages newer than the client's last seen
+    message id (?after= on first connect, Last-Event-ID on reconnect).
+    Each check is one indexed range query for id > last_id, so only new
+    messages ever cross the wire.
+    """
+    match = _match_or_403(match_id)
+    last_id = request.headers.get("Last-Event-ID", type=int) or request.args.get("after", 0, type=int)
+    match_id, user_id = match.id, current_user.id
+    # Detached, so the commits below don't expire it between polls
+    db.session.expunge(match)
+
+    def events(last_id):
+        deadline = time.monotonic() + STREAM_SECONDS
+        yield "retry: 1000\n\n"
+        try:
+            while time.monotonic() < deadline:
+                new = [
+                    _message_json(msg)
+                    for msg in Message.query.filter(
+                        Message.match_id == match_id, Message.id > last_id
+                    )
+                    .order_by(Message.id.asc())
+                    .limit(STREAM_BATCH)
+                ]
+                if new:
+                    # The user is watching, so these count as read
+                    mark_read(match, user_id, new[-1]["id"])
+                    db.session.commit()
+                # Give the connection back to the pool while idle
+                db.session.remove()
+
+                for payload in new:
+                    last_id = payload["id"]
+                    yield f"id: {last_id}\nevent: message\ndata: {json.dumps(payload)}\n\n"
+
+                if len(new) < STREAM_BATCH:
+                    with _new_message:
+                        _new_message.wait(POLL_SECONDS)
+                    # Comment line: keeps proxies from closing an idle stream
+                    # and surfaces a disconnected client on the next write
+                    yield ": ping\n\n"
+        finally:
+            db.session.remove()
+
+    response = Response(stream_with_context(events(last_id)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
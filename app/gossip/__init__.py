@@ -2,4 +2,4 @@ from flask import Blueprint
 
 gossip_bp = Blueprint("gossip", __name__, url_prefix="/gossip")
 
-from . import routes  # noqa
+from . import routes, commands  # noqa
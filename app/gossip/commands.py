@@ -0,0 +1,38 @@
+import click
+
+from . import gossip_bp
+from .comments import reconcile_comment_counts
+from .ranking import refresh_hot_scores
+from .votes import reconcile_vote_counters
+
+
+@gossip_bp.cli.command("refresh-hot")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--all", "all_rows", is_flag=True,
+              help="Every gossip, not just the last week (backfill after upgrading).")
+def refresh_hot_command(batch_size, all_rows):
+    """Re-decay hot scores of recent gossips (run from cron)."""
+    refreshed = refresh_hot_scores(batch_size=batch_size, all_rows=all_rows)
+    click.echo(f"Refreshed hot score of {refreshed} gossips.")
+
+
+@gossip_bp.cli.command("reconcile-votes")
+@click.option("--dry-run", is_flag=True, help="Only report drift, don't fix it.")
+def reconcile_votes_command(dry_run):
+    """Recompute vote counters from GossipVote rows and report drift."""
+    drift = reconcile_vote_counters(fix=not dry_run)
+    for gid, stored_up, stored_down, up, down in drift:
+        click.echo(f"gossip {gid}: stored +{stored_up}/-{stored_down}, actual +{up}/-{down}")
+    verb = "Found" if dry_run else "Fixed"
+    click.echo(f"{verb} {len(drift)} gossips with drifted counters.")
+
+
+@gossip_bp.cli.command("reconcile-comments")
+@click.option("--dry-run", is_flag=True, help="Only report drift, don't fix it.")
+def reconcile_comments_command(dry_run):
+    """Recompute comment counts from GossipComment rows and report drift."""
+    drift = reconcile_comment_counts(fix=not dry_run)
+    for gid, stored, actual in drift:
+        click.echo(f"gossip {gid}: stored {stored}, actual {actual}")
+    verb = "Found" if dry_run else "Fixed"
+    click.echo(f"{verb} {len(drift)} gossips with drifted comment counts.")
@@ -0,0 +1,72 @@
+from sqlalchemy import func, update
+
+from ..extensions import db
+from ..models import Gossip, GossipComment
+from .feed_cache import bump_generation
+from ..pagination import keyset_page
+
+
+def add_comment(gossip: Gossip, user_id: int, text: str) -> GossipComment:
+    """
+    Insert a comment and bump the gossip's comment_count in one transaction.
+    The count is incremented by the UPDATE itself (comment_count + 1), so
+    concurrent commenters never overwrite each other's increments.
+    """
+    comment = GossipComment(gossip_id=gossip.id, text=text, created_by_user_id=user_id)
+    db.session.add(comment)
+    db.session.flush()
+    db.session.execute(
+        update(Gossip)
+        .where(Gossip.id == gossip.id)
+        .values(comment_count=Gossip.comment_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return comment
+
+
+def comments_page(gossip_id: int, cursor: str | None, limit: int):
+    """
+    Newest-first page of a gossip's comments after `cursor`, read from the
+    (gossip_id, created_at, id) index. Returns (comments, next_cursor).
+    """
+    query = GossipComment.query.filter(GossipComment.gossip_id == gossip_id)
+    return keyset_page(query, GossipComment.created_at, GossipComment.id, cursor, limit)
+
+
+def comment_count_drift():
+    """
+    (gossip_id, stored, actual) for every gossip whose comment_count
+    disagrees with its GossipComment rows, in one aggregate query.
+    """
+    tallies = (
+        db.session.query(GossipComment.gossip_id.label("gossip_id"), func.count().label("n"))
+        .group_by(GossipComment.gossip_id)
+        .subquery()
+    )
+    actual = func.coalesce(tallies.c.n, 0)
+    stored = func.coalesce(Gossip.comment_count, 0)
+    return (
+        db.session.query(Gossip.id, stored, actual)
+        .outerjoin(tallies, tallies.c.gossip_id == Gossip.id)
+        .filter(stored != actual)
+        .order_by(Gossip.id)
+        .all()
+    )
+
+
+def reconcile_comment_counts(fix: bool = True):
+    """
+    Rewrite comment_count of the gossips that drifted (or were created
+    before the column existed) in a single bulk UPDATE.
+    Returns the drift rows found (see comment_count_drift).
+    """
+    drift = comment_count_drift()
+    if fix and drift:
+        db.session.bulk_update_mappings(
+            Gossip,
+            [{"id": gid, "comment_count": actual} for gid, _, actual in drift],
+        )
+        bump_generation()
+        db.session.commit()
+    return drift
@@ -0,0 +1,145 @@
+import hashlib
+
+from sqlalchemy import func, inspect, select
+
+from ..cache import LRUCache
+from ..extensions import db
+from ..models import FeedGeneration, Gossip
+from ..upsert import insert_for
+
+
+# Feed pages kept per worker, and how long one is served before it is
+# queried again. New gossips, votes and comments invalidate the pages they
+# affect in this worker right away; the TTL bounds how long they can go
+# unseen in another worker (or a vote go unreflected in the page order).
+# Moderation must take effect everywhere at once, so it bumps a generation
+# counter in the database that is part of every page's key instead.
+FEED_CACHE_SIZE = 512
+FEED_CACHE_TTL_SECONDS = 30
+
+# Generation row shared by every category
+EVERY_CATEGORY = "*"
+
+_pages = LRUCache(maxsize=FEED_CACHE_SIZE, ttl=FEED_CACHE_TTL_SECONDS)
+
+_COLUMNS = [c.key for c in inspect(Gossip).column_attrs]
+
+
+class FeedPage:
+    """One cached page of the feed: column values of its gossips, in order."""
+
+    __slots__ = ("rows", "has_next", "ids", "digest")
+
+    def __init__(self, rows, has_next):
+        self.rows = rows
+        self.has_next = has_next
+        self.ids = frozenset(row["id"] for row in rows)
+        # Everything the page shows that can change; equal digests mean an
+        # identical page, in this worker or any other
+        shown = [
+            (row["id"], row["upvotes"], row["downvotes"], row["comment_count"])
+            for row in rows
+        ]
+        self.digest = hashlib.sha1(repr((shown, has_next)).encode()).hexdigest()
+
+    def gossips(self) -> list[Gossip]:
+        # Fresh transient instances per request: templates read attributes
+        # only, and nothing cached is shared with a session
+        return [Gossip(**row) for row in self.rows]
+
+
+def _query(category: str, sort: str, page: int, per_page: int) -> FeedPage:
+    query = Gossip.query.filter_by(is_deleted=False)
+
+    # Filter by category if not "all"
+    if category != "all":
+        query = query.filter_by(category=category)
+
+    # Sorting mode: each one matches an ix_gossip_feed_* index
+    if sort == "latest":
+        query = query.order_by(Gossip.created_at.desc())
+    elif sort == "hot":
+        query = query.order_by(Gossip.hot_score.desc())
+    else:
+        # "top" = highest stored score, tie-break by newest
+        query = query.order_by(Gossip.score.desc(), Gossip.created_at.desc())
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return FeedPage(
+        [{key: getattr(g, key) for key in _COLUMNS} for g in rows[:per_page]],
+        len(rows) > per_page,
+    )
+
+
+def _generation(category: str) -> int:
+    # Both rows only ever grow, so their sum changes whenever either does
+    return db.session.execute(
+        select(func.coalesce(func.sum(FeedGeneration.generation), 0))
+        .where(FeedGeneration.category.in_((category, EVERY_CATEGORY)))
+    ).scalar()
+
+
+def feed_page(category: str, sort: str, page: int, per_page: int) -> FeedPage:
+    """
+    The (category, sort, page) page of the feed, from cache when possible.
+    A hit costs one primary-key read of the category's generation.
+    """
+    key = (category, sort, page, per_page, _generation(category))
+    cached = _pages.get(key)
+    if cached is None:
+        cached = _query(category, sort, page, per_page)
+        _pages.set(key, cached)
+    return cached
+
+
+def etag_for(page: FeedPage, user_id: int) -> str:
+    """Per-user validator of a feed page (the page around it is per-user)."""
+    return hashlib.sha1(f"{page.digest}:{user_id}".encode()).hexdigest()
+
+
+# -------------------------------------------------
+# Invalidation in this worker, called after the write has committed
+# -------------------------------------------------
+def invalidate_category(category: str | None):
+    """A gossip was added to `category`: every page of it and of "all" may have shifted."""
+    _pages.pop_where(lambda key, _: key[0] in (category, "all"))
+
+
+def invalidate_gossip(gossip_id: int):
+    """
+    A gossip's shown values changed: drop the pages showing it. Used for
+    votes too; the pages a vote would move it into follow within the TTL.
+    """
+    _pages.pop_where(lambda _, page: gossip_id in page.ids)
+
+
+def invalidate_sort(sort: str):
+    _pages.pop_where(lambda key, _: key[1] == sort)
+
+
+# -------------------------------------------------
+# Invalidation in every worker, called inside the write's transaction
+# -------------------------------------------------
+def bump_generation(*categories):
+    """
+    Moderation: drop the pages of `categories` and of "all" (of every
+    category when none are given) in every worker, as part of the caller's
+    transaction, so the change shows up everywhere once it commits.
+    """
+    categories = {c for c in categories if c is not None}
+    keys = sorted(categories | {"all"}) if categories else [EVERY_CATEGORY]
+    table = FeedGeneration.__table__
+    for category in keys:
+        db.session.execute(
+            insert_for(FeedGeneration)
+            .values(category=category, generation=1)
+            .on_conflict_do_update(
+                index_elements=[table.c.category],
+                set_={"generation": table.c.generation + 1},
+            )
+        )
+
+
+def cache_stats() -> dict:
+    return _pages.stats()
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, update
+
+from ..extensions import db
+from ..models import Gossip
+from ..tasks import periodic
+from .feed_cache import invalidate_sort
+
+
+# Hacker News style decay: (score + 1) / (age_hours + 2) ** gravity.
+# The +1 gives fresh gossips a small head start over old ones at score 0.
+HOT_GRAVITY = 1.8
+
+# The frequent refresh only re-decays gossips younger than this; older ones
+# have decayed to near zero and change slowly.
+HOT_WINDOW = timedelta(days=7)
+
+# How often the in-process jobs re-decay hot scores (see app/tasks.py):
+# the recent window often, every gossip once a day
+HOT_REFRESH_SECONDS = 600
+HOT_FULL_REFRESH_SECONDS = 24 * 3600
+
+
+def decay(created_at: datetime | None, now: datetime | None = None) -> float:
+    """Age factor of the hot score: hot_score = (score + 1) * decay."""
+    now = now or datetime.utcnow()
+    created_at = created_at or now
+    age_hours = max((now - created_at).total_seconds() / 3600, 0.0)
+    return 1.0 / (age_hours + 2) ** HOT_GRAVITY
+
+
+def hot_score(score: int, created_at: datetime | None, now: datetime | None = None) -> float:
+    return (score + 1) * decay(created_at, now)
+
+
+def rescore(gossip: Gossip, now: datetime | None = None):
+    """Recompute the stored rankings of one gossip from its vote counters."""
+    gossip.score = (gossip.upvotes or 0) - (gossip.downvotes or 0)
+    gossip.hot_score = hot_score(gossip.score, gossip.created_at, now)
+
+
+def refresh_hot_scores(batch_size: int = 1000, now: datetime | None = None,
+                       all_rows: bool = False) -> int:
+    """
+    Periodic job: re-decay hot scores of recent gossips, rewriting `score`
+    from the vote counters on the way so the two never disagree for long.
+    With `all_rows`, every gossip (deleted or older than HOT_WINDOW too):
+    the one-off backfill of rows that predate the columns, and the daily
+    pass that keeps old gossips from freezing at their last value.
+    Walks the rows in id order, one SELECT + one executemany UPDATE per
+    batch. Only the decay factor comes from Python; both scores are
+    computed from the counters by the UPDATE itself, so a vote committed
+    in between is never overwritten.
+    Returns the number of gossips refreshed.
+    """
+    now = now or datetime.utcnow()
+    window = []
+    if not all_rows:
+        window = [Gossip.is_deleted.is_(False), Gossip.created_at >= now - HOT_WINDOW]
+    gossips = Gossip.__table__
+    score = func.coalesce(gossips.c.upvotes, 0) - func.coalesce(gossips.c.downvotes, 0)
+    rescore_rows = (
+        update(gossips)
+        .where(gossips.c.id == bindparam("gid"))
+        .values(score=score, hot_score=(score + 1) * bindparam("decay"))
+    )
+    last_id = 0
+    refreshed = 0
+
+    while True:
+        rows = (
+            db.session.query(Gossip.id, Gossip.created_at)
+            .filter(*window, Gossip.id > last_id)
+            .order_by(Gossip.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        db.session.execute(
+            rescore_rows,
+            [{"gid": gid, "decay": decay(created_at, now)} for gid, created_at in rows],
+        )
+        db.session.commit()
+
+        refreshed += len(rows)
+        last_id = rows[-1].id
+
+    if refreshed:
+        invalidate_sort("hot")
+    return refreshed
+
+
+@periodic("refresh-hot", HOT_REFRESH_SECONDS)
+def refresh_hot_task():
+    refresh_hot_scores()
+
+
+@periodic("refresh-hot-all", HOT_FULL_REFRESH_SECONDS)
+def refresh_all_hot_task():
+    refresh_hot_scores(all_rows=True)
@@ -1,9 +1,23 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify
+from flask import (
+    render_template, request, redirect, url_for, flash, jsonify,
+    Response, make_response, session,
+)
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 
 from . import gossip_bp
 from ..extensions import db
-from ..models import Gossip, GossipComment, GossipVote
+from ..models import Gossip, GossipVote
+from .comments import add_comment, comments_page
+from .feed_cache import (
+    etag_for,
+    feed_page,
+    invalidate_category,
+    invalidate_gossip,
+)
+from .ranking import rescore
+from .search import search_gossips
+from .votes import apply_vote
 
 
 # Available gossip categories for filters and dropdown
@@ -16,6 +30,13 @@ CATEGORIES = [
     "random",
 ]
 
+# Sort modes offered by the feed; "new" is kept as an alias of "latest"
+SORTS = ("latest", "top", "hot")
+
+GOSSIP_PAGE_SIZE = 20
+
+COMMENTS_PAGE_SIZE = 30
+
 
 @gossip_bp.route("/", methods=["GET", "POST"])
 @login_required
@@ -43,41 +64,72 @@ def feed():
             text=text,
             category=category,
             created_by_user_id=current_user.id,
+            upvotes=0,
+            downvotes=0,
         )
+        rescore(gossip)
         db.session.add(gossip)
         db.session.commit()
+        invalidate_category(gossip.category)
         flash("Anonymous gossip posted 👀", "success")
         return redirect(url_for("gossip.feed"))
 
     # ---------- LIST / FILTER GOSSIPS ----------
-    # Query params: ?category=hostel&sort=top
+    # Query params: ?category=hostel&sort=top&page=2
     category_filter = request.args.get("category", "all")
-    sort = request.args.get("sort", "top")  # "top" | "new"
+    sort = request.args.get("sort", "top")  # "latest" | "top" | "hot"
+    if sort == "new":
+        sort = "latest"
+    if sort not in SORTS:
+        sort = "top"
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    # Pages come from the feed cache; a client that already has this page
+    # (same gossips, scores and comment counts) gets a bodiless 304
+    feed = feed_page(category_filter, sort, page, GOSSIP_PAGE_SIZE)
+    etag = etag_for(feed, current_user.id)
+    if request.if_none_match.contains(etag) and not session.get("_flashes"):
+        return _feed_response(Response(status=304), etag)
+
+    html = render_template(
+        "gossip/feed.html",
+        gossips=feed.gossips(),
+        categories=CATEGORIES,
+        current_category=category_filter,
+        current_sort=sort,
+        page=page,
+        has_next=feed.has_next,
+    )
+    return _feed_response(make_response(html), etag)
 
-    query = Gossip.query.filter_by(is_deleted=False)
 
-    # Filter by category if not "all"
-    if category_filter != "all":
-        query = query.filter_by(category=category_filter)
+def _feed_response(response, etag):
+    # Private and always revalidated: the page is per-user, and a cached
+    # copy must not outlive a new gossip or vote
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
-    # Sorting mode
-    if sort == "new":
-        query = query.order_by(Gossip.created_at.desc())
-    else:
-        # "top" = highest score (upvotes - downvotes), tie-break by newest
-        query = query.order_by(
-            (Gossip.upvotes - Gossip.downvotes).desc(),
-            Gossip.created_at.desc(),
-        )
 
-    gossips = query.all()
+@gossip_bp.route("/search")
+@login_required
+def search():
+    """
+    Full-text search over gossips and their comments:
+    ?q=<words>&page=2, best matches (relevance lifted by score) first.
+    """
+    q = request.args.get("q", "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    gossips, has_next = search_gossips(q, page, GOSSIP_PAGE_SIZE) if q else ([], False)
 
     return render_template(
-        "gossip/feed.html",
+        "gossip/search.html",
         gossips=gossips,
-        categories=CATEGORIES,
-        current_category=category_filter,
-        current_sort=sort,
+        q=q,
+        page=page,
+        has_next=has_next,
     )
 
 
@@ -100,23 +152,15 @@ def detail(gossip_id):
         if not text:
             flash("Comment cannot be empty.", "danger")
         else:
-            comment = GossipComment(
-                gossip_id=gossip.id,
-                text=text,
-                created_by_user_id=current_user.id,
-            )
-            db.session.add(comment)
-            db.session.commit()
+            add_comment(gossip, current_user.id, text)
+            invalidate_gossip(gossip.id)
             flash("Comment added anonymously.", "success")
 
         return redirect(url_for("gossip.detail", gossip_id=gossip.id))
 
     # ---------- LOAD COMMENTS ----------
-    comments = (
-        GossipComment.query.filter_by(gossip_id=gossip.id)
-        .order_by(GossipComment.created_at.asc())
-        .all()
-    )
+    # Newest first; older pages come from gossip.comments_more
+    comments, next_cursor = comments_page(gossip.id, None, COMMENTS_PAGE_SIZE)
 
     # Current user's vote (for highlighting in template if you want)
     vote = GossipVote.query.filter_by(
@@ -129,10 +173,25 @@ def detail(gossip_id):
         "gossip/detail.html",
         gossip=gossip,
         comments=comments,
+        next_cursor=next_cursor,
         user_vote=user_vote,
     )
 
 
+@gossip_bp.route("/<int:gossip_id>/comments")
+@login_required
+def comments_more(gossip_id):
+    """AJAX "load older comments": the page after ?cursor=."""
+    gossip = Gossip.query.get_or_404(gossip_id)
+    if gossip.is_deleted:
+        return jsonify({"ok": False, "error": "Gossip removed"}), 400
+    comments, next_cursor = comments_page(
+        gossip.id, request.args.get("cursor"), COMMENTS_PAGE_SIZE
+    )
+    html = "".join(render_template("gossip/_comment.html", c=c) for c in comments)
+    return jsonify({"ok": True, "html": html, "next_cursor": next_cursor})
+
+
 @gossip_bp.route("/vote/<int:gossip_id>", methods=["POST"])
 @login_required
 def vote(gossip_id):
@@ -152,60 +211,20 @@ def vote(gossip_id):
 
     value = 1 if action == "up" else -1
 
-    vote = GossipVote.query.filter_by(
-        gossip_id=gossip.id,
-        user_id=current_user.id,
-    ).first()
-
-    # Remove previous influence, if any
-    if vote:
-        if vote.value == 1:
-            gossip.upvotes -= 1
-        elif vote.value == -1:
-            gossip.downvotes -= 1
-
-        # Same vote clicked again -> remove vote entirely
-        if vote.value == value:
-            db.session.delete(vote)
-            db.session.commit()
-            score = gossip.upvotes - gossip.downvotes
-            return jsonify(
-                {
-                    "ok": True,
-                    "upvotes": gossip.upvotes,
-                    "downvotes": gossip.downvotes,
-                    "score": score,
-                    "user_vote": 0,
-                }
-            )
-
-        # Switch vote
-        vote.value = value
-    else:
-        # First-time vote by this user on this gossip
-        vote = GossipVote(
-            gossip_id=gossip.id,
-            user_id=current_user.id,
-            value=value,
-        )
-        db.session.add(vote)
-
-    # Apply new influence
-    if value == 1:
-        gossip.upvotes += 1
-    else:
-        gossip.downvotes += 1
-
-    db.session.commit()
-
-    score = gossip.upvotes - gossip.downvotes
+    try:
+        upvotes, downvotes, user_vote = apply_vote(gossip, current_user.id, value)
+    except IntegrityError:
+        # Another request from this user created the vote first
+        db.session.rollback()
+        return jsonify({"ok": False, "error": "Vote already recorded, try again"}), 409
+    invalidate_gossip(gossip.id)
 
     return jsonify(
         {
             "ok": True,
-            "upvotes": gossip.upvotes,
-            "downvotes": gossip.downvotes,
-            "score": score,
-            "user_vote": value,
+            "upvotes": upvotes,
+            "downvotes": downvotes,
+            "score": upvotes - downvotes,
+            "user_vote": user_vote,
         }
     )
@@ -0,0 +1,150 @@
+import math
+
+from sqlalchemy import func, literal_column, text, union_all
+
+from ..extensions import db
+from ..models import Gossip, GossipComment
+from ..search import SearchIndexDDL, dialect_name, fts5_query, query_terms
+
+
+# A hit in a comment counts for this much of a hit in the gossip itself
+W_COMMENT = 0.5
+
+# How strongly votes lift a relevant gossip: relevance * (1 + W_SCORE * ln(1 + score))
+W_SCORE = 0.25
+
+# Best-matching gossips ranked per query; deeper pages than this are not offered
+MAX_CANDIDATES = 500
+
+
+# -------------------------------------------------
+# Native full-text indexes
+# -------------------------------------------------
+# Both tables are indexed on text only, so votes and soft deletes (which
+# touch other columns) never rewrite index entries; is_deleted is checked
+# when querying instead.
+# PostgreSQL: GIN expression indexes matching the tsvector the query uses.
+# SQLite: FTS5 tables over gossip / gossip_comment text, kept in sync by
+# triggers that only fire on inserts, deletes and text edits.
+_PG_CONFIG = "'english'"
+
+
+def _fts5_ddl(table: str) -> list[str]:
+    fts = f"{table}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"text, content='{table}', content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.id, old.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.id, old.text); "
+        f"INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END",
+    ]
+
+
+def _pg_ddl(table: str) -> list[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} "
+        f"USING gin (to_tsvector({_PG_CONFIG}, text))",
+    ]
+
+
+gossip_search_ddl = SearchIndexDDL(
+    Gossip.__table__,
+    postgresql=_pg_ddl("gossip"),
+    sqlite=_fts5_ddl("gossip"),
+    rebuild_sqlite=["INSERT INTO gossip_fts(gossip_fts) VALUES ('rebuild')"],
+)
+comment_search_ddl = SearchIndexDDL(
+    GossipComment.__table__,
+    postgresql=_pg_ddl("gossip_comment"),
+    sqlite=_fts5_ddl("gossip_comment"),
+    rebuild_sqlite=["INSERT INTO gossip_comment_fts(gossip_comment_fts) VALUES ('rebuild')"],
+)
+
+
+def _candidates(q: str, terms: list[str]):
+    """(gossip_id, relevance, score) of the best text matches, most relevant first."""
+    dialect = dialect_name()
+
+    if dialect == "postgresql":
+        config = literal_column(_PG_CONFIG)
+        tsquery = func.plainto_tsquery(config, q)
+        gossip_doc = func.to_tsvector(config, Gossip.text)
+        comment_doc = func.to_tsvector(config, GossipComment.text)
+        hits = union_all(
+            db.select(Gossip.id.label("gossip_id"), func.ts_rank(gossip_doc, tsquery).label("rank"))
+            .where(gossip_doc.op("@@")(tsquery)),
+            db.select(GossipComment.gossip_id, (func.ts_rank(comment_doc, tsquery) * W_COMMENT).label("rank"))
+            .where(comment_doc.op("@@")(tsquery)),
+        ).subquery()
+        relevance = func.sum(hits.c.rank)
+        return (
+            db.session.query(Gossip.id, relevance, Gossip.score)
+            .join(hits, hits.c.gossip_id == Gossip.id)
+            .filter(Gossip.is_deleted.isnot(True))
+            .group_by(Gossip.id, Gossip.score)
+            .order_by(relevance.desc(), Gossip.id.desc())
+            .limit(MAX_CANDIDATES)
+            .all()
+        )
+
+    if dialect == "sqlite":
+        # bm25() is lower-is-better, so it is negated into a relevance
+        return db.session.execute(
+            text(
+                "SELECT g.id, SUM(h.rank) AS relevance, g.score FROM ("
+                "  SELECT rowid AS gossip_id, -bm25(gossip_fts) AS rank"
+                "  FROM gossip_fts WHERE gossip_fts MATCH :match"
+                "  UNION ALL"
+                "  SELECT c.gossip_id, -bm25(gossip_comment_fts) * :w_comment"
+                "  FROM gossip_comment_fts"
+                "  JOIN gossip_comment c ON c.id = gossip_comment_fts.rowid"
+                "  WHERE gossip_comment_fts MATCH :match"
+                ") h JOIN gossip g ON g.id = h.gossip_id "
+                "WHERE g.is_deleted = 0 OR g.is_deleted IS NULL "
+                "GROUP BY g.id, g.score "
+                "ORDER BY relevance DESC, g.id DESC LIMIT :limit"
+            ),
+            {"match": fts5_query(terms), "w_comment": W_COMMENT, "limit": MAX_CANDIDATES},
+        ).all()
+
+    # No native full-text support: substring match on the gossip text only
+    return (
+        db.session.query(Gossip.id, literal_column("1.0"), Gossip.score)
+        .filter(Gossip.is_deleted.isnot(True), Gossip.text.ilike(f"%{q}%"))
+        .order_by(Gossip.id.desc())
+        .limit(MAX_CANDIDATES)
+        .all()
+    )
+
+
+def _rank(relevance: float, score: int) -> float:
+    return relevance * (1.0 + W_SCORE * math.log1p(max(score or 0, 0)))
+
+
+def search_gossips(q: str, page: int, per_page: int):
+    """
+    Non-deleted gossips whose text or comments contain every word of `q`,
+    ranked by text relevance lifted by their vote score.
+
+    Returns (gossips, has_next) for the 1-based `page`.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return [], False
+
+    ranked = sorted(
+        _candidates(q.strip(), terms),
+        key=lambda row: (-_rank(row[1], row[2]), -row[0]),
+    )
+    start = (page - 1) * per_page
+    ids = [row[0] for row in ranked[start:start + per_page]]
+    has_next = len(ranked) > start + per_page
+    if not ids:
+        return [], has_next
+
+    gossips = {g.id: g for g in Gossip.query.filter(Gossip.id.in_(ids))}
+    return [gossips[i] for i in ids if i in gossips], has_next
@@ -0,0 +1,142 @@
+from sqlalchemy import case, func, or_, update
+
+from ..extensions import db
+from ..models import Gossip, GossipVote
+from .feed_cache import bump_generation
+from .ranking import decay, hot_score
+
+
+def apply_vote(gossip: Gossip, user_id: int, value: int):
+    """
+    Apply an up (+1) / down (-1) vote from one user, toggling it off if the
+    same vote is cast again.
+
+    Counters are never read-modified-written in Python: the change is sent
+    as a single UPDATE ... SET upvotes = upvotes + :d ... RETURNING, so
+    concurrent voters on the same gossip can't lose each other's updates.
+    The user's own vote row is locked (FOR UPDATE on PostgreSQL) so one
+    user's double-clicks serialize instead of double counting.
+
+    Returns (upvotes, downvotes, user_vote) as committed.
+    Raises sqlalchemy.exc.IntegrityError if a concurrent first vote from the
+    same user won the race for the (gossip_id, user_id) unique constraint.
+    """
+    vote = (
+        GossipVote.query.filter_by(gossip_id=gossip.id, user_id=user_id)
+        .with_for_update()
+        .first()
+    )
+
+    d_up = d_down = 0
+
+    # Remove previous influence, if any
+    if vote:
+        if vote.value == 1:
+            d_up -= 1
+        elif vote.value == -1:
+            d_down -= 1
+
+    if vote and vote.value == value:
+        # Same vote clicked again -> remove vote entirely
+        db.session.delete(vote)
+        user_vote = 0
+    else:
+        if vote:
+            vote.value = value
+        else:
+            db.session.add(GossipVote(gossip_id=gossip.id, user_id=user_id, value=value))
+        if value == 1:
+            d_up += 1
+        else:
+            d_down += 1
+        user_vote = value
+
+    db.session.flush()
+
+    # created_at never changes, so the decay factor can be bound from Python
+    # while the score itself is taken from the row being updated.
+    new_score = Gossip.score + (d_up - d_down)
+    upvotes, downvotes = db.session.execute(
+        update(Gossip)
+        .where(Gossip.id == gossip.id)
+        .values(
+            upvotes=Gossip.upvotes + d_up,
+            downvotes=Gossip.downvotes + d_down,
+            score=new_score,
+            hot_score=(new_score + 1) * decay(gossip.created_at),
+        )
+        .returning(Gossip.upvotes, Gossip.downvotes)
+        .execution_options(synchronize_session=False)
+    ).one()
+    db.session.commit()
+
+    return upvotes, downvotes, user_vote
+
+
+def vote_drift():
+    """
+    Compare the stored counters of every gossip with the GossipVote rows in
+    one aggregate query.
+
+    Returns a list of (gossip_id, stored_up, stored_down, actual_up, actual_down)
+    for gossips whose counters (or score) disagree with their votes.
+    """
+    tallies = (
+        db.session.query(
+            GossipVote.gossip_id.label("gossip_id"),
+            func.sum(case((GossipVote.value == 1, 1), else_=0)).label("up"),
+            func.sum(case((GossipVote.value == -1, 1), else_=0)).label("down"),
+        )
+        .group_by(GossipVote.gossip_id)
+        .subquery()
+    )
+    actual_up = func.coalesce(tallies.c.up, 0)
+    actual_down = func.coalesce(tallies.c.down, 0)
+    stored_up = func.coalesce(Gossip.upvotes, 0)
+    stored_down = func.coalesce(Gossip.downvotes, 0)
+
+    return (
+        db.session.query(Gossip.id, stored_up, stored_down, actual_up, actual_down)
+        .outerjoin(tallies, tallies.c.gossip_id == Gossip.id)
+        .filter(
+            or_(
+                stored_up != actual_up,
+                stored_down != actual_down,
+                Gossip.score != actual_up - actual_down,
+            )
+        )
+        .order_by(Gossip.id)
+        .all()
+    )
+
+
+def reconcile_vote_counters(fix: bool = True):
+    """
+    Recompute upvotes / downvotes / score from GossipVote and rewrite only
+    the gossips that drifted, in a single bulk UPDATE.
+    Votes that land while this runs may need a second pass; re-running
+    converges. Returns the drift rows found (see vote_drift).
+    """
+    drift = vote_drift()
+    if fix and drift:
+        created = dict(
+            db.session.query(Gossip.id, Gossip.created_at)
+            .filter(Gossip.id.in_([row[0] for row in drift]))
+            .all()
+        )
+        db.session.bulk_update_mappings(
+            Gossip,
+            [
+                {
+                    "id": gid,
+                    "upvotes": up,
+                    "downvotes": down,
+                    "score": up - down,
+                    "hot_score": hot_score(up - down, created.get(gid)),
+                }
+                for gid, _, _, up, down in drift
+            ],
+        )
+        bump_generation()
+        db.session.commit()
+    return drift
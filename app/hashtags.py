@@ -0,0 +1,161 @@
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+
+from .cache import LRUCache
+from .extensions import db
+from .models import Hashtag, HashtagBucket, post_hashtags
+from .upsert import insert_for
+
+
+HASHTAG_RE = re.compile(r"#(\w+)")
+
+# Hashtag.name is a String(64)
+MAX_TAG_LENGTH = 64
+
+TRENDING_WINDOWS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+# Buckets older than the longest window are no longer read
+BUCKET_RETENTION = timedelta(weeks=1, days=1)
+
+# Trending results are reused for this long per (window, limit)
+TRENDING_TTL_SECONDS = 60
+
+
+def extract_hashtags(text: str | None) -> list[str]:
+    """Distinct lower-cased tags in order of first appearance."""
+    seen = []
+    for tag in HASHTAG_RE.findall(text or ""):
+        tag = tag.lower()
+        if len(tag) <= MAX_TAG_LENGTH and tag not in seen:
+            seen.append(tag)
+    return seen
+
+
+def _bucket(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def attach_hashtags(post) -> list[str]:
+    """
+    Extraction stage of post creation, run in the caller's transaction once
+    the post is flushed. Whatever the number of tags it costs five statements:
+    upsert the hashtags, read their ids, insert the association rows, bump
+    the lifetime counts and upsert the current hour's trending buckets.
+    Returns the tags found.
+    """
+    names = extract_hashtags(post.text)
+    if not names:
+        return names
+
+    db.session.execute(
+        insert_for(Hashtag)
+        .values([{"name": name, "count": 0} for name in names])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    ids = [
+        row.id
+        for row in db.session.query(Hashtag.id).filter(Hashtag.name.in_(names))
+    ]
+
+    db.session.execute(
+        insert_for(post_hashtags)
+        .values([{"post_id": post.id, "hashtag_id": hid} for hid in ids])
+        .on_conflict_do_nothing()
+    )
+    db.session.execute(
+        update(Hashtag)
+        .where(Hashtag.id.in_(ids))
+        .values(count=Hashtag.count + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+    bucket = _bucket(post.created_at or datetime.utcnow())
+    stmt = insert_for(HashtagBucket).values(
+        [{"hashtag_id": hid, "bucket_start": bucket, "count": 1} for hid in ids]
+    )
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["hashtag_id", "bucket_start"],
+            set_={"count": HashtagBucket.count + stmt.excluded.count},
+        )
+    )
+    return names
+
+
+def release_hashtags(post_ids):
+    """
+    Lifetime counts -1 for every tag of posts about to be deleted.
+    Trending buckets are left alone: they count uses at the time.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    per_tag = (
+        db.session.query(post_hashtags.c.hashtag_id, func.count())
+        .filter(post_hashtags.c.post_id.in_(post_ids))
+        .group_by(post_hashtags.c.hashtag_id)
+        .all()
+    )
+    # Usually every tag drops by 1: one UPDATE per distinct decrement
+    by_amount = {}
+    for hid, n in per_tag:
+        by_amount.setdefault(n, []).append(hid)
+    for n, ids in by_amount.items():
+        db.session.execute(
+            update(Hashtag)
+            .where(Hashtag.id.in_(ids))
+            .values(count=Hashtag.count - n)
+            .execution_options(synchronize_session=False)
+        )
+
+
+_trending_cache = LRUCache(maxsize=32, ttl=TRENDING_TTL_SECONDS)
+
+
+def trending(window: str = "day", limit: int = 10) -> list[tuple[str, int]]:
+    """
+    Top tags of the last hour / day / week as (name, uses), summed from the
+    hourly buckets of the window (an index range on bucket_start), and
+    memoized for TRENDING_TTL_SECONDS.
+    """
+    span = TRENDING_WINDOWS.get(window, TRENDING_WINDOWS["day"])
+    key = (window, limit)
+    rows = _trending_cache.get(key)
+    if rows is not None:
+        return rows
+
+    since = _bucket(datetime.utcnow() - span)
+    uses = func.sum(HashtagBucket.count).label("uses")
+    top = (
+        db.session.query(HashtagBucket.hashtag_id, uses)
+        .filter(HashtagBucket.bucket_start >= since)
+        .group_by(HashtagBucket.hashtag_id)
+        .order_by(uses.desc())
+        .limit(limit)
+        .subquery()
+    )
+    rows = [
+        (name, int(n))
+        for name, n in db.session.query(Hashtag.name, top.c.uses)
+        .join(top, top.c.hashtag_id == Hashtag.id)
+        .order_by(top.c.uses.desc(), Hashtag.name)
+    ]
+
+    _trending_cache.set(key, rows)
+    return rows
+
+
+def prune_buckets(now: datetime | None = None) -> int:
+    """Delete buckets no trending window reads any more."""
+    cutoff = (now or datetime.utcnow()) - BUCKET_RETENTION
+    deleted = HashtagBucket.query.filter(HashtagBucket.bucket_start < cutoff).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    return deleted
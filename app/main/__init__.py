@@ -2,4 +2,4 @@ from flask import Blueprint
 
 main_bp = Blueprint("main", __name__)
 
-from . import routes  # noqa
+from . import routes, commands  # noqa
@@ -0,0 +1,11 @@
+import click
+
+from . import main_bp
+from ..hashtags import prune_buckets
+
+
+@main_bp.cli.command("prune-trending")
+def prune_trending_command():
+    """Delete hourly hashtag buckets older than the longest trending window."""
+    deleted = prune_buckets()
+    click.echo(f"Deleted {deleted} old trending buckets.")
@@ -1,9 +1,33 @@
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload, selectinload
 from . import main_bp
-from ..models import Post, Hashtag, Story, User
+from ..models import Post, Hashtag, post_hashtags
 from ..extensions import db
-from datetime import datetime
+from ..hashtags import attach_hashtags, trending as trending_tags, TRENDING_WINDOWS
+from ..pagination import keyset_page
+from ..stories.index import active_stories
+
+
+# Posts per feed page (first render and each "load more")
+FEED_PAGE_SIZE = 20
+
+
+def feed_page(cursor=None, hashtag=None):
+    """
+    One page of the feed (or of one hashtag's posts), newest first.
+    Authors are joined in and hashtags fetched with a single IN query,
+    so rendering a page never lazy-loads per post.
+    """
+    query = Post.query.options(
+        joinedload(Post.author),
+        selectinload(Post.hashtags),
+    )
+    if hashtag is not None:
+        query = query.join(post_hashtags, post_hashtags.c.post_id == Post.id).filter(
+            post_hashtags.c.hashtag_id == hashtag.id
+        )
+    return keyset_page(query, Post.created_at, Post.id, cursor, FEED_PAGE_SIZE)
 
 
 @main_bp.route("/", methods=["GET", "POST"])
@@ -17,39 +41,60 @@ def feed():
         else:
             post = Post(user_id=current_user.id, text=text, type="general")
             db.session.add(post)
+            db.session.flush()
+            attach_hashtags(post)
             db.session.commit()
             flash("Post created.", "success")
             return redirect(url_for("main.feed"))
 
     # Handle GET request - display feed
-    now = datetime.utcnow()
-
-    # Fetch active stories
-    my_story = Story.query.filter(
-        Story.user_id == current_user.id,
-        Story.expires_at > now
-    ).order_by(Story.created_at.desc()).first()
-
-    story_users = (
-        db.session.query(User)
-        .join(Story, Story.user_id == User.id)
-        .filter(
-            Story.expires_at > now,
-            User.id != current_user.id
-        )
-        .distinct()
-        .all()
-    )
+    # Story ring comes from the in-memory index, no query
+    my_story, story_users = active_stories.ring(current_user.id)
 
-    # Fetch posts and trending hashtags
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    trending = Hashtag.query.order_by(Hashtag.count.desc()).limit(10).all()
+    # Fetch first page of posts and trending hashtags
+    posts, next_cursor = feed_page()
+    window = request.args.get("trending", "day")
+    if window not in TRENDING_WINDOWS:
+        window = "day"
+    trending = trending_tags(window, limit=10)
 
     return render_template(
         "main/feed.html",
         posts=posts,
+        next_cursor=next_cursor,
         trending=trending,
+        trending_window=window,
         my_story=my_story,
         story_users=story_users,
     )
 
+
+@main_bp.route("/feed/more")
+@login_required
+def feed_more():
+    """
+    AJAX endpoint for infinite scroll: renders the next page of posts
+    after ?cursor= (within ?tag= if given) and hands back the cursor for
+    the page after that.
+    """
+    hashtag = None
+    if request.args.get("tag"):
+        hashtag = Hashtag.query.filter_by(name=request.args["tag"].lower()).first_or_404()
+    posts, next_cursor = feed_page(request.args.get("cursor"), hashtag)
+    html = "".join(
+        render_template("main/_post.html", post=post) for post in posts
+    )
+    return jsonify({"html": html, "next_cursor": next_cursor})
+
+
+@main_bp.route("/tags/<tag>")
+@login_required
+def tag_page(tag):
+    hashtag = Hashtag.query.filter_by(name=tag.lower()).first_or_404()
+    posts, next_cursor = feed_page(hashtag=hashtag)
+    return render_template(
+        "main/tag.html",
+        hashtag=hashtag,
+        posts=posts,
+        next_cursor=next_cursor,
+    )
@@ -0,0 +1,71 @@
+import mimetypes
+import os
+import re
+
+from flask import abort, current_app, make_response, send_from_directory
+from werkzeug.security import safe_join
+
+from . import media_bp
+
+
+# "<sha256><ext>" originals and "<sha256>_<width>.webp" renditions (see
+# app/uploads.py): the name is derived from the bytes, so it never changes
+HASHED_NAME_RE = re.compile(r"^(?P<etag>[0-9a-f]{64}(?:_\d+)?)\.[a-z0-9]+$")
+
+# Content-hashed files never change: cache them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _accel_response(filename: str, path: str, etag: str | None):
+    """
+    Hand the file to the front web server: nginx (X-Accel-Redirect) or
+    Apache / lighttpd (X-Sendfile) streams it, including Range and
+    conditional requests, while the worker only sends headers.
+    """
+    mode = current_app.config.get("MEDIA_ACCEL")
+    response = make_response("")
+    if mode == "x-accel-redirect":
+        prefix = current_app.config.get("MEDIA_ACCEL_PREFIX", "/_media/")
+        response.headers["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + filename
+    else:
+        response.headers["X-Sendfile"] = path
+    response.headers["Content-Type"] = (
+        mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    )
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+@media_bp.route("/<filename>")
+def file(filename):
+    """
+    Serve an upload: strong ETag and conditional GET / HTTP Range from
+    send_from_directory, immutable caching for content-hashed names, or
+    an X-Sendfile / X-Accel-Redirect hand-off when MEDIA_ACCEL is set.
+    """
+    folder = current_app.config["UPLOAD_FOLDER"]
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    hashed = HASHED_NAME_RE.match(filename)
+    etag = hashed.group("etag") if hashed else None
+
+    if current_app.config.get("MEDIA_ACCEL"):
+        response = _accel_response(filename, path, etag)
+    else:
+        # etag=True derives one from mtime / size / name for legacy files
+        response = send_from_directory(folder, filename, conditional=True, etag=etag or True)
+
+    response.cache_control.public = True
+    if hashed:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Uploads stored under the old user_<id>_<filename> scheme can be
+        # replaced in place, so browsers must revalidate them
+        response.cache_control.max_age = 0
+        response.cache_control.no_cache = True
+    return response
@@ -1,4 +1,4 @@
-from datetime import datetime, date
+from datetime import datetime
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from .extensions import db
@@ -10,6 +10,8 @@ post_hashtags = db.Table(
     "post_hashtags",
     db.Column("post_id", db.Integer, db.ForeignKey("post.id"), primary_key=True),
     db.Column("hashtag_id", db.Integer, db.ForeignKey("hashtag.id"), primary_key=True),
+    # Tag pages look posts up by hashtag
+    db.Index("ix_post_hashtags_hashtag_post", "hashtag_id", "post_id"),
 )
 
 
@@ -44,9 +46,25 @@ class User(UserMixin, db.Model):
     plan = db.Column(db.String(20), default="free")  # free / plus / pro
     plan_expires_at = db.Column(db.DateTime, nullable=True)
 
-    # Swipe tracking
-    last_swipe_date = db.Column(db.Date, nullable=True)
-    swipes_today = db.Column(db.Integer, default=0)
+    # Bumped by every UPDATE of the row, ORM or bulk (onupdate applies to
+    # both). The user loader cache compares it to tell a cached copy is
+    # current, whichever worker made the change (see app/user_cache.py).
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        onupdate=db.literal_column("version") + 1,
+    )
+
+    __table_args__ = (
+        # Admin user directory: each filter walks its index newest id first
+        db.Index("ix_user_banned_id", "is_banned", "id"),
+        db.Index("ix_user_admin_id", "is_admin", "id"),
+        db.Index("ix_user_plan_id", "plan", "id"),
+        db.Index("ix_user_branch_year_id", "branch", "year", "id"),
+        db.Index("ix_user_created_at", "created_at"),
+    )
 
     def set_password(self, password: str):
         self.password_hash = generate_password_hash(password)
@@ -72,24 +90,6 @@ class User(UserMixin, db.Model):
 
         return current >= req
 
-    def can_swipe_today(self, max_swipes: int | None) -> bool:
-        today = date.today()
-        if self.last_swipe_date != today:
-            self.last_swipe_date = today
-            self.swipes_today = 0
-        if max_swipes is None:
-            return True
-        return self.swipes_today < max_swipes
-
-    def register_swipe(self):
-        from .extensions import db as _db
-        today = date.today()
-        if self.last_swipe_date != today:
-            self.last_swipe_date = today
-            self.swipes_today = 0
-        self.swipes_today += 1
-        _db.session.commit()
-
 
 class Post(db.Model):
     __tablename__ = "post"
@@ -113,6 +113,11 @@ class Post(db.Model):
         lazy="subquery",
     )
 
+    __table_args__ = (
+        # Serves the newest-first keyset pagination of the main feed
+        db.Index("ix_post_created_at_id", "created_at", "id"),
+    )
+
 
 class Hashtag(db.Model):
     __tablename__ = "hashtag"
@@ -128,6 +133,22 @@ class Hashtag(db.Model):
     )
 
 
+class HashtagBucket(db.Model):
+    """
+    Uses of one hashtag within one hour, maintained at post creation.
+    Trending for a window sums the buckets inside it instead of scanning posts.
+    """
+    __tablename__ = "hashtag_bucket"
+
+    hashtag_id = db.Column(db.Integer, db.ForeignKey("hashtag.id"), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # truncated to the hour
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_hashtag_bucket_start", "bucket_start", "hashtag_id"),
+    )
+
+
 class Event(db.Model):
     __tablename__ = "event"
 
@@ -167,6 +188,20 @@ class Like(db.Model):
     mode = db.Column(db.String(20))      # "dating" or "event"
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # One like per direction and mode; also serves the reverse-like lookup
+        db.Index("uq_like_from_to_mode", "from_user_id", "to_user_id", "mode", unique=True),
+    )
+
+
+class SwipeCounter(db.Model):
+    """Likes a user has spent from their daily swipe quota (see app/quota.py)."""
+    __tablename__ = "swipe_counter"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
 
 class Match(db.Model):
     __tablename__ = "match"
@@ -178,8 +213,36 @@ class Match(db.Model):
     event_id = db.Column(db.Integer, db.ForeignKey("event.id"))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Denormalized inbox state, updated with every message (see chat/inbox.py).
+    # last_message_at starts at the match time so new matches sort by recency too;
+    # matches from before these columns get it from `flask chat backfill-inbox`.
+    last_message_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_message_preview = db.Column(db.String(140))
+    last_message_sender_id = db.Column(db.Integer)
+
+    # Per-user read cursor (last message id seen) and unread count
+    user1_last_read_id = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    user2_last_read_id = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    user1_unread = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    user2_unread = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     messages = db.relationship("Message", backref="match", lazy=True)
 
+    __table_args__ = (
+        # Inbox: a user's matches by recent activity, one index per side
+        # (id breaks ties in the same order the inbox sorts)
+        db.Index("ix_match_user1_activity", "user1_id", "last_message_at", "id"),
+        db.Index("ix_match_user2_activity", "user2_id", "last_message_at", "id"),
+        # Pairs are stored canonically as (min id, max id), so a pair can
+        # only ever have one match per mode whoever liked first
+        db.CheckConstraint("user1_id < user2_id", name="ck_match_canonical_pair"),
+        db.UniqueConstraint("user1_id", "user2_id", "mode", name="uq_match_pair_mode"),
+    )
+
+    @staticmethod
+    def pair(a: int, b: int) -> tuple[int, int]:
+        return (a, b) if a < b else (b, a)
+
 
 class Message(db.Model):
     __tablename__ = "message"
@@ -190,6 +253,11 @@ class Message(db.Model):
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # History pages and live updates are id ranges within one match
+        db.Index("ix_message_match_id_id", "match_id", "id"),
+    )
+
 
 class Story(db.Model):
     __tablename__ = "story"
@@ -200,6 +268,12 @@ class Story(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime)
 
+    __table_args__ = (
+        # Active-story lookups per user, and the expiry reaper
+        db.Index("ix_story_user_expires", "user_id", "expires_at"),
+        db.Index("ix_story_expires_at", "expires_at"),
+    )
+
 
 class Gossip(db.Model):
     __tablename__ = "gossip"
@@ -221,6 +295,16 @@ class Gossip(db.Model):
     upvotes = db.Column(db.Integer, default=0)
     downvotes = db.Column(db.Integer, default=0)
 
+    # Precomputed rankings so every feed sort is an index scan:
+    # score = upvotes - downvotes, hot_score = time-decayed score
+    # (see gossip/ranking.py)
+    score = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    hot_score = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+
+    # Incremented in the same transaction as each comment insert
+    # (see gossip/comments.py), so lists can show it without a COUNT
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     # Soft delete (for admin moderation)
     is_deleted = db.Column(db.Boolean, default=False)
 
@@ -232,6 +316,28 @@ class Gossip(db.Model):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # One index per feed sort, for a single category and for "all"
+        db.Index("ix_gossip_feed_category_new", "is_deleted", "category", "created_at"),
+        db.Index("ix_gossip_feed_category_top", "is_deleted", "category", "score", "created_at"),
+        db.Index("ix_gossip_feed_category_hot", "is_deleted", "category", "hot_score"),
+        db.Index("ix_gossip_feed_new", "is_deleted", "created_at"),
+        db.Index("ix_gossip_feed_top", "is_deleted", "score", "created_at"),
+        db.Index("ix_gossip_feed_hot", "is_deleted", "hot_score"),
+    )
+
+
+class FeedGeneration(db.Model):
+    """
+    Generation of the cached feed pages of one category ("all" for the
+    combined feed, "*" for every feed); bumping it makes every worker
+    drop those pages at once (see gossip/feed_cache.py).
+    """
+    __tablename__ = "feed_generation"
+
+    category = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
 
 class GossipComment(db.Model):
     __tablename__ = "gossip_comment"
@@ -244,6 +350,11 @@ class GossipComment(db.Model):
     # Internal only; UI remains anonymous
     created_by_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
+    __table_args__ = (
+        # Newest-first keyset pages of one gossip's comments
+        db.Index("ix_gossip_comment_gossip_created", "gossip_id", "created_at", "id"),
+    )
+
 
 class GossipVote(db.Model):
     """
@@ -272,7 +383,36 @@ class Report(db.Model):
     reason = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    resolved = db.Column(db.Boolean, default=False)
+    # NOT NULL so "open" is resolved = false, which the indexes below can
+    # search (rows from before the constraint: flask admin backfill-reports)
+    resolved = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     resolved_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
 
+    __table_args__ = (
+        # The moderation queue groups open reports by target
+        db.Index("ix_report_resolved_post", "resolved", "post_id"),
+        db.Index("ix_report_resolved_gossip", "resolved", "gossip_id"),
+    )
+
+
+class DailyStat(db.Model):
+    """
+    Rows created per metric per day, kept up to date as they are inserted
+    (see app/stats.py). Each (day, metric) is split over a few shards so
+    concurrent inserts don't all queue on one row; readers sum them.
+    """
+    __tablename__ = "daily_stat"
+
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(32), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class StatCounter(db.Model):
+    """Running total per metric, sharded like DailyStat (see app/stats.py)."""
+    __tablename__ = "stat_counter"
 
+    metric = db.Column(db.String(32), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, default=0)
+    value = db.Column(db.Integer, nullable=False, default=0)
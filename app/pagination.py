@@ -0,0 +1,55 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque, URL-safe cursor for a (created_at, id) position."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None):
+    """
+    Returns (created_at, id) or None for a missing / malformed cursor,
+    so a bad ?cursor= simply restarts from the first page.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(query, created_col, id_col, cursor: str | None, limit: int):
+    """
+    Newest-first keyset pagination on (created_at, id).
+
+    Instead of OFFSET, each page continues strictly after the last row of the
+    previous one, so the database walks a composite (created_at, id) index
+    and every page costs the same no matter how deep the user scrolls.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(tuple_(created_col, id_col) < position)
+
+    rows = (
+        query.order_by(created_col.desc(), id_col.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, created_col.key), getattr(last, id_col.key)
+        )
+    return rows, next_cursor
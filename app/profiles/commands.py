@@ -0,0 +1,13 @@
+import click
+
+from . import profiles_bp
+from ..search import create_search_indexes
+
+
+@profiles_bp.cli.command("init-search")
+@click.option("--rebuild/--no-rebuild", default=True,
+              help="Re-index existing rows (SQLite FTS tables).")
+def init_search_command(rebuild):
+    """Create the full-text search indexes on an existing database."""
+    create_search_indexes(rebuild=rebuild)
+    click.echo("Search indexes are in place.")
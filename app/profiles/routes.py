@@ -1,9 +1,11 @@
-import os
-from flask import render_template, request, redirect, url_for, flash, current_app, jsonify
+from flask import render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from . import profiles_bp
 from ..extensions import db
 from ..models import User
+from ..uploads import UploadRejected, media_url, save_upload
+from ..user_cache import invalidate_user
+from .search import search_users as search_profiles, typeahead, reindex_user
 
 
 
@@ -21,12 +23,16 @@ def me():
 
         file = request.files.get("photo")
         if file and file.filename:
-            filename = f"user_{user.id}_{file.filename}"
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(path)
-            user.photo = filename
+            try:
+                user.photo = save_upload(file)
+            except UploadRejected as e:
+                db.session.rollback()
+                flash(str(e), "danger")
+                return redirect(url_for("profiles.me"))
 
         db.session.commit()
+        invalidate_user(user.id)
+        reindex_user(user)
         flash("Profile updated.", "success")
         return redirect(url_for("profiles.me"))
 
@@ -37,24 +43,13 @@ def me():
 def search_users():
     q = request.args.get("q", "").strip()
 
-    users = []
-    if q:
-        users = User.query.filter(
-            User.name.ilike(f"%{q}%")
-        ).limit(20).all()
-
-    # AJAX request
+    # AJAX request: search-as-you-type, answered from the in-memory index
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        return jsonify([
-            {
-                "id": u.id,
-                "name": u.name,
-                "photo": u.photo
-            }
-            for u in users
-        ])
+        results = typeahead(q) if q else []
+        return jsonify([{**u, "photo_url": media_url(u["photo"], 160)} for u in results])
 
-    # Normal page load
+    # Normal page load: ranked full-text search in the database
+    users = search_profiles(q) if q else []
     return render_template("profiles/search.html", users=users, q=q)
 
 @profiles_bp.route("/<int:user_id>")
@@ -0,0 +1,325 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import func, literal_column, or_, text
+
+from ..extensions import db
+from ..models import User
+from ..search import (
+    SearchIndexDDL,
+    dialect_name,
+    fts5_prefix_query,
+    query_terms,
+    tsquery_prefix,
+)
+from ..tasks import periodic
+
+
+SEARCH_LIMIT = 20
+
+# How much a term matching each field counts towards a result's rank
+W_NAME = 4.0
+W_BRANCH = 2.0
+W_YEAR = 1.0
+W_INTERESTS = 1.0
+
+# A whole-word hit ranks above a prefix hit on the same field
+EXACT_BONUS = 1.5
+
+# How long a built prefix index is reused before it is rebuilt (by the
+# periodic task when background tasks run, see app/tasks.py)
+PREFIX_INDEX_TTL_SECONDS = 300
+
+
+# -------------------------------------------------
+# Native full-text indexes
+# -------------------------------------------------
+# PostgreSQL: GIN over the same tsvector expression the query uses, plus a
+# trigram index on lower(name) for typo-tolerant name matches.
+# SQLite: an FTS5 table over the user columns, kept in sync by triggers.
+_PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(branch, '') "
+    "|| ' ' || coalesce(year, '') || ' ' || coalesce(interests, ''))"
+)
+_FTS_COLUMNS = "name, branch, year, interests"
+
+user_search_ddl = SearchIndexDDL(
+    User.__table__,
+    postgresql=[
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        'CREATE INDEX IF NOT EXISTS ix_user_name_trgm ON "user" '
+        "USING gin (lower(name) gin_trgm_ops)",
+        # Substring search on email in the admin user directory
+        'CREATE INDEX IF NOT EXISTS ix_user_email_trgm ON "user" '
+        "USING gin (lower(email) gin_trgm_ops)",
+        f'CREATE INDEX IF NOT EXISTS ix_user_search ON "user" USING gin ({_PG_DOCUMENT})',
+    ],
+    sqlite=[
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS user_fts USING fts5("
+        f"{_FTS_COLUMNS}, content='user', content_rowid='id')",
+        f'CREATE TRIGGER IF NOT EXISTS user_fts_ai AFTER INSERT ON "user" BEGIN '
+        f"INSERT INTO user_fts(rowid, {_FTS_COLUMNS}) "
+        f"VALUES (new.id, new.name, new.branch, new.year, new.interests); END",
+        f'CREATE TRIGGER IF NOT EXISTS user_fts_ad AFTER DELETE ON "user" BEGIN '
+        f"INSERT INTO user_fts(user_fts, rowid, {_FTS_COLUMNS}) "
+        f"VALUES ('delete', old.id, old.name, old.branch, old.year, old.interests); END",
+        f'CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF {_FTS_COLUMNS} ON "user" BEGIN '
+        f"INSERT INTO user_fts(user_fts, rowid, {_FTS_COLUMNS}) "
+        f"VALUES ('delete', old.id, old.name, old.branch, old.year, old.interests); "
+        f"INSERT INTO user_fts(rowid, {_FTS_COLUMNS}) "
+        f"VALUES (new.id, new.name, new.branch, new.year, new.interests); END",
+    ],
+    rebuild_sqlite=["INSERT INTO user_fts(user_fts) VALUES ('rebuild')"],
+)
+
+
+def _not_banned():
+    return or_(User.is_banned.is_(False), User.is_banned.is_(None))
+
+
+def _ranked_ids(q: str, terms: list[str], limit: int) -> list[int]:
+    dialect = dialect_name()
+
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", tsquery_prefix(terms))
+        document = literal_column(_PG_DOCUMENT)
+        name = func.lower(User.name)
+        rank = func.ts_rank(document, tsquery) + func.similarity(name, q.lower())
+        rows = (
+            db.session.query(User.id)
+            .filter(_not_banned(), or_(document.op("@@")(tsquery), name.op("%")(q.lower())))
+            .order_by(rank.desc(), User.id)
+            .limit(limit)
+        )
+        return [row.id for row in rows]
+
+    if dialect == "sqlite":
+        # bm25() is lower-is-better; per-column weights follow the W_* order
+        rows = db.session.execute(
+            text(
+                'SELECT u.id FROM user_fts JOIN "user" u ON u.id = user_fts.rowid '
+                "WHERE user_fts MATCH :match "
+                "AND (u.is_banned = 0 OR u.is_banned IS NULL) "
+                "ORDER BY bm25(user_fts, :w_name, :w_branch, :w_year, :w_interests), u.id "
+                "LIMIT :limit"
+            ),
+            {
+                "match": fts5_prefix_query(terms),
+                "w_name": W_NAME,
+                "w_branch": W_BRANCH,
+                "w_year": W_YEAR,
+                "w_interests": W_INTERESTS,
+                "limit": limit,
+            },
+        )
+        return [row.id for row in rows]
+
+    # No native full-text support: substring match on the name only
+    rows = (
+        db.session.query(User.id)
+        .filter(_not_banned(), User.name.ilike(f"%{q}%"))
+        .order_by(User.name, User.id)
+        .limit(limit)
+    )
+    return [row.id for row in rows]
+
+
+def search_users(q: str, limit: int = SEARCH_LIMIT) -> list[User]:
+    """
+    Users matching every word of `q` as a prefix of their name, branch, year
+    or interests, best match first, using the database's full-text index.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    ids = _ranked_ids(q.strip(), terms, limit)
+    if not ids:
+        return []
+    users = {u.id: u for u in User.query.filter(User.id.in_(ids))}
+    return [users[i] for i in ids if i in users]
+
+
+# -------------------------------------------------
+# In-memory prefix index for search-as-you-type
+# -------------------------------------------------
+def _tokens(user_row) -> dict[str, float]:
+    """token -> best field weight for one (id, name, photo, year, branch, interests) row."""
+    weights = {}
+    for value, weight in (
+        (user_row.name, W_NAME),
+        (user_row.branch, W_BRANCH),
+        (user_row.year, W_YEAR),
+        (user_row.interests, W_INTERESTS),
+    ):
+        for token in query_terms(value.replace(",", " ") if value else ""):
+            weights[token] = max(weights.get(token, 0.0), weight)
+    return weights
+
+
+def _display(user_row) -> dict:
+    return {
+        "id": user_row.id,
+        "name": user_row.name,
+        "photo": user_row.photo,
+        "year": user_row.year,
+        "branch": user_row.branch,
+    }
+
+
+class UserPrefixIndex:
+    """
+    Sorted (token, user) postings of every non-banned user, plus the few
+    fields a typeahead result shows. A keystroke is a bisect per query term
+    over the sorted tokens and never touches the database.
+
+    Profile edits and new users go into a small overlay that is searched
+    alongside the postings (and shadows the user's old postings) until the
+    next rebuild folds them in.
+    """
+
+    def __init__(self, rows):
+        postings = []
+        self.users = {}
+        for row in rows:
+            self.users[row.id] = _display(row)
+            postings.extend((token, row.id, w) for token, w in _tokens(row).items())
+        postings.sort()
+        self.tokens = [p[0] for p in postings]
+        self.postings = [(p[1], p[2]) for p in postings]
+        self.overlay = {}  # user_id -> (tokens, display) or None if removed
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_db(cls):
+        rows = db.session.query(
+            User.id, User.name, User.photo, User.year, User.branch, User.interests
+        ).filter(_not_banned())
+        return cls(rows.all())
+
+    def __len__(self):
+        return len(self.users)
+
+    def update(self, *users):
+        entries = {
+            user.id: None if user.is_banned else (_tokens(user), _display(user))
+            for user in users
+        }
+        # Copy-on-write, so searches running in other threads never see
+        # the overlay change under them
+        self.overlay = {**self.overlay, **entries}
+
+    def _term_scores(self, term: str, overlay: dict) -> dict[int, float]:
+        scores = {}
+        lo = bisect_left(self.tokens, term)
+        hi = bisect_left(self.tokens, term + "\uffff", lo)
+        for i in range(lo, hi):
+            user_id, weight = self.postings[i]
+            if user_id in overlay:
+                continue
+            if self.tokens[i] == term:
+                weight *= EXACT_BONUS
+            scores[user_id] = max(scores.get(user_id, 0.0), weight)
+        for user_id, entry in overlay.items():
+            if entry is None:
+                continue
+            for token, weight in entry[0].items():
+                if token.startswith(term):
+                    if token == term:
+                        weight *= EXACT_BONUS
+                    scores[user_id] = max(scores.get(user_id, 0.0), weight)
+        return scores
+
+    def search(self, q: str, limit: int = SEARCH_LIMIT) -> list[dict]:
+        """Display dicts of users matching every term of `q`, best first."""
+        overlay = self.overlay
+        totals = None
+        for term in query_terms(q):
+            scores = self._term_scores(term, overlay)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {u: totals[u] + s for u, s in scores.items() if u in totals}
+            if not totals:
+                return []
+        if not totals:
+            return []
+
+        best = heapq.nsmallest(limit, totals.items(), key=lambda kv: (-kv[1], kv[0]))
+        results = []
+        for user_id, _ in best:
+            entry = overlay.get(user_id)
+            results.append(entry[1] if entry else self.users[user_id])
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+_MISSING = object()
+
+
+def _stale(index) -> bool:
+    return index is None or time.monotonic() - index.built_at > PREFIX_INDEX_TTL_SECONDS
+
+
+def get_prefix_index() -> UserPrefixIndex:
+    """
+    The process-wide prefix index. Keystrokes never wait on a rebuild while
+    the periodic task keeps it fresh; it is only built inline the first time
+    a worker needs it, or when no background tasks are running.
+    """
+    global _index
+    background = bool(current_app.extensions.get("periodic_tasks"))
+    index = _index
+    if index is not None and (background or not _stale(index)):
+        return index
+    with _index_lock:
+        if _index is None or (not background and _stale(_index)):
+            _index = UserPrefixIndex.from_db()
+        return _index
+
+
+@periodic("rebuild-prefix-index", PREFIX_INDEX_TTL_SECONDS)
+def rebuild_prefix_index_task():
+    # Built outside the lock while typeahead keeps using the old index.
+    # Users reindexed in this worker meanwhile may be missing from the
+    # database snapshot, so their overlay entries are carried over.
+    global _index
+    with _index_lock:
+        before = _index.overlay if _index is not None else {}
+    index = UserPrefixIndex.from_db()
+    with _index_lock:
+        if _index is not None:
+            index.overlay = {
+                user_id: entry
+                for user_id, entry in _index.overlay.items()
+                if before.get(user_id, _MISSING) is not entry
+            }
+        _index = index
+
+
+def typeahead(q: str, limit: int = SEARCH_LIMIT) -> list[dict]:
+    return get_prefix_index().search(q, limit)
+
+
+def reindex_user(user):
+    """Make a created / edited / (un)banned user searchable in this worker now;
+    other workers pick the change up on their next rebuild."""
+    with _index_lock:
+        if _index is not None:
+            _index.update(user)
+
+
+def reindex_users(user_ids):
+    """reindex_user() for many users at once, read in one query."""
+    user_ids = list(user_ids)
+    if not user_ids or _index is None:
+        return
+    rows = db.session.query(
+        User.id, User.name, User.photo, User.year, User.branch, User.interests, User.is_banned
+    ).filter(User.id.in_(user_ids)).all()
+    with _index_lock:
+        if _index is not None:
+            _index.update(*rows)
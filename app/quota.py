@@ -0,0 +1,190 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from flask import after_this_request, current_app
+
+from .extensions import db
+from .models import SwipeCounter
+from .subscriptions import get_plan
+from .tasks import periodic
+from .upsert import insert_for
+
+
+# "db": every like is an atomic conditional increment of the user's
+# SwipeCounter row, exact across all workers.
+# "memory": likes are counted in per-worker buckets and written back every
+# FLUSH_SECONDS by flush_task; no write per swipe, but concurrent workers can
+# together overshoot a limit by what they consumed since their last flush.
+QUOTA_MODES = ("db", "memory")
+
+FLUSH_SECONDS = 10
+
+# SwipeCounter rows older than this are deleted
+COUNTER_RETENTION = timedelta(days=7)
+
+
+def swipe_limit(user) -> int | None:
+    """Likes per day allowed by the user's plan; None means unlimited."""
+    plan_key = user.plan or "free"
+    if plan_key != "free" and not user.is_premium:
+        plan_key = "free"  # expired subscription
+    plan = get_plan(plan_key) or get_plan("free")
+    return plan["swipes_per_day"]
+
+
+def _mode() -> str:
+    mode = current_app.config.get("SWIPE_QUOTA_MODE", "db")
+    return mode if mode in QUOTA_MODES else "db"
+
+
+# -------------------------------------------------
+# Database counters
+# -------------------------------------------------
+def _increment(user_id: int, day: date, amount: int, limit: int | None = None,
+               connection=None):
+    """
+    INSERT ... ON CONFLICT DO UPDATE SET count = count + :amount
+    [WHERE count + :amount <= :limit] RETURNING count.
+    The conflicting row is locked for the update, so concurrent requests
+    can't both pass the check. Returns the new count, or None if the
+    limit stopped the increment.
+    """
+    if limit is not None and amount > limit:
+        return None
+    counter = SwipeCounter.__table__
+    stmt = insert_for(SwipeCounter).values(user_id=user_id, day=day, count=amount)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[counter.c.user_id, counter.c.day],
+        set_={"count": counter.c.count + amount},
+        where=(counter.c.count + amount <= limit) if limit is not None else None,
+    ).returning(counter.c.count)
+    return (connection or db.session).execute(stmt).scalar()
+
+
+def used_today(user_id: int, day: date | None = None) -> int:
+    row = db.session.get(SwipeCounter, (user_id, day or date.today()))
+    return row.count if row else 0
+
+
+# -------------------------------------------------
+# In-memory token buckets
+# -------------------------------------------------
+class _Bucket:
+    __slots__ = ("base", "pending")
+
+    def __init__(self, base: int):
+        self.base = base        # count in the database at the last sync
+        self.pending = 0        # consumed here, not yet written back
+
+
+class QuotaBuckets:
+    """Per-worker swipe counters, written back to SwipeCounter in batches."""
+
+    def __init__(self):
+        self._buckets = {}  # (user_id, day) -> _Bucket
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def consume(self, user_id: int, limit: int | None, day: date) -> bool:
+        key = (user_id, day)
+        with self._lock:
+            bucket = self._buckets.get(key)
+        if bucket is None:
+            # First swipe of the day in this worker: start from the stored count
+            base = used_today(user_id, day)
+            with self._lock:
+                bucket = self._buckets.setdefault(key, _Bucket(base))
+        with self._lock:
+            if limit is not None and bucket.base + bucket.pending >= limit:
+                return False
+            bucket.pending += 1
+        return True
+
+    def flush(self, today: date | None = None):
+        """Write pending counts back and refresh each bucket's base, in one
+        transaction; buckets of past days are dropped once written."""
+        today = today or date.today()
+        with self._lock:
+            dirty = [(key, b, b.pending) for key, b in self._buckets.items() if b.pending]
+            for key in [k for k in self._buckets if k[1] < today]:
+                if not self._buckets[key].pending:
+                    del self._buckets[key]
+            self._flushed_at = time.monotonic()
+        if not dirty:
+            return 0
+
+        # Own connection and transaction, so a flush never commits (or is
+        # rolled back with) whatever the current session holds
+        with db.engine.begin() as connection:
+            counts = {
+                key: _increment(key[0], key[1], pending, connection=connection)
+                for key, _, pending in dirty
+            }
+
+        with self._lock:
+            for key, bucket, pending in dirty:
+                bucket.pending -= pending
+                bucket.base = counts[key]
+                if key[1] < today and not bucket.pending:
+                    self._buckets.pop(key, None)
+        return len(dirty)
+
+    def due(self) -> bool:
+        return time.monotonic() - self._flushed_at > FLUSH_SECONDS
+
+
+buckets = QuotaBuckets()
+
+
+# -------------------------------------------------
+# Public API
+# -------------------------------------------------
+def consume_swipe(user) -> bool:
+    """
+    Take one swipe from the user's daily quota. In "db" mode this joins
+    the caller's transaction: roll it back to give the swipe back.
+    Returns False once the plan's daily limit is reached.
+    """
+    limit = swipe_limit(user)
+    if limit is not None and limit <= 0:
+        return False
+    today = date.today()
+
+    if _mode() == "memory":
+        allowed = buckets.consume(user.id, limit, today)
+        if buckets.due() and not current_app.extensions.get("periodic_tasks"):
+            # No flush_task in this worker: flush once the request is done
+            after_this_request(_flush_after_request)
+        return allowed
+
+    return _increment(user.id, today, 1, limit) is not None
+
+
+def _flush_after_request(response):
+    # The view has returned, so anything its session still holds uncommitted
+    # is rolled back at teardown anyway; end it first, or the flush (on a
+    # second connection) would wait on the request's write lock (SQLite
+    # allows one writer per database)
+    db.session.rollback()
+    buckets.flush()
+    return response
+
+
+def prune_counters(today: date | None = None) -> int:
+    cutoff = (today or date.today()) - COUNTER_RETENTION
+    deleted = SwipeCounter.query.filter(SwipeCounter.day < cutoff).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    return deleted
+
+
+@periodic("flush-swipe-quota", FLUSH_SECONDS)
+def flush_task():
+    buckets.flush()
+
+
+@periodic("prune-swipe-counters", 3600)
+def prune_task():
+    prune_counters()
@@ -0,0 +1,75 @@
+from urllib.parse import quote
+
+from flask import has_request_context, request, url_for
+from markupsafe import Markup, escape
+
+from .cache import LRUCache
+from .hashtags import HASHTAG_RE
+
+
+# Rendered bodies kept per worker
+POST_CACHE_SIZE = 5000
+
+_post_cache = LRUCache(maxsize=POST_CACHE_SIZE)
+
+# url_for() is resolved once with this stand-in tag, then the real tags
+# are spliced into the resulting URL, percent-encoded as url_for() would
+_TAG_PLACEHOLDER = "__tag__"
+
+# (before, after) halves of the tag URL per script root
+_tag_urls = {}
+
+
+def _tag_url_parts() -> tuple[str, str]:
+    root = request.script_root if has_request_context() else ""
+    parts = _tag_urls.get(root)
+    if parts is None:
+        url = url_for("main.tag_page", tag=_TAG_PLACEHOLDER)
+        before, _, after = url.partition(_TAG_PLACEHOLDER)
+        parts = _tag_urls[root] = (before, after)
+    return parts
+
+
+def link_hashtags(text: str | None) -> Markup:
+    """
+    Escape text and turn each #tag into a link to its tag page.
+    One pass of the precompiled tag regex; the tag URL is built once.
+    """
+    if not text:
+        return Markup("")
+    before, after = _tag_url_parts()
+    out = []
+    pos = 0
+    for match in HASHTAG_RE.finditer(text):
+        out.append(escape(text[pos:match.start()]))
+        tag = match.group(1)
+        href = escape(f"{before}{quote(tag.lower(), safe='')}{after}")
+        out.append(Markup(f'<a href="{href}" class="hashtag-link">#{escape(tag)}</a>'))
+        pos = match.end()
+    out.append(escape(text[pos:]))
+    return Markup("").join(out)
+
+
+def render_post_body(post) -> Markup:
+    """
+    link_hashtags() of a post's text, memoized per (post id, content hash),
+    so an unchanged post costs one dictionary lookup per render and an
+    edited one simply misses. The tag URL prefix is part of the key in case
+    the app is mounted under different roots.
+    """
+    text = post.text or ""
+    key = (post.id, hash(text), _tag_url_parts())
+    html = _post_cache.get(key)
+    if html is None:
+        html = link_hashtags(text)
+        _post_cache.set(key, html)
+    return html
+
+
+def cache_stats() -> dict:
+    return _post_cache.stats()
+
+
+def init_app(app):
+    app.jinja_env.filters["link_hashtags"] = link_hashtags
+    app.jinja_env.filters["render_post"] = render_post_body
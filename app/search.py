@@ -0,0 +1,73 @@
+import re
+
+from sqlalchemy import DDL, event, text
+
+from .extensions import db
+
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Terms beyond this are ignored; keeps pathological queries cheap
+MAX_TERMS = 8
+
+
+def query_terms(q: str | None) -> list[str]:
+    """Lower-cased word terms of a search box query, safe to splice into
+    FTS5 MATCH / to_tsquery syntax (letters, digits and _ only)."""
+    return [t.lower() for t in TERM_RE.findall(q or "")][:MAX_TERMS]
+
+
+def fts5_query(terms: list[str]) -> str:
+    """SQLite FTS5: every term must match a whole (stemmed) word ("ab" "cd")."""
+    return " ".join(f'"{t}"' for t in terms)
+
+
+def fts5_prefix_query(terms: list[str]) -> str:
+    """SQLite FTS5: every term must match as a prefix ("ab"* "cd"*)."""
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def tsquery_prefix(terms: list[str]) -> str:
+    """PostgreSQL to_tsquery: every term must match as a prefix (ab:* & cd:*)."""
+    return " & ".join(f"{t}:*" for t in terms)
+
+
+def dialect_name() -> str:
+    return db.session.get_bind().dialect.name
+
+
+class SearchIndexDDL:
+    """
+    Native full-text objects for one table, per dialect: PostgreSQL GIN
+    (tsvector / pg_trgm) indexes, SQLite FTS5 external-content tables kept
+    in sync by triggers. They are created with the table by db.create_all(),
+    and `create()` applies them to an existing database (all statements are
+    IF NOT EXISTS).
+    """
+
+    registry = []
+
+    def __init__(self, table, postgresql=(), sqlite=(), rebuild_sqlite=()):
+        self.table = table
+        self.statements = {"postgresql": list(postgresql), "sqlite": list(sqlite)}
+        self.rebuild_statements = {"sqlite": list(rebuild_sqlite)}
+        for dialect, statements in self.statements.items():
+            for statement in statements:
+                event.listen(
+                    table, "after_create", DDL(statement).execute_if(dialect=dialect)
+                )
+        SearchIndexDDL.registry.append(self)
+
+    def create(self, rebuild: bool = False):
+        dialect = dialect_name()
+        for statement in self.statements.get(dialect, []):
+            db.session.execute(text(statement))
+        if rebuild:
+            for statement in self.rebuild_statements.get(dialect, []):
+                db.session.execute(text(statement))
+        db.session.commit()
+
+
+def create_search_indexes(rebuild: bool = False):
+    for ddl in SearchIndexDDL.registry:
+        ddl.create(rebuild=rebuild)
@@ -0,0 +1,219 @@
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func, inspect
+
+from .extensions import db
+from .models import (
+    DailyStat,
+    Event,
+    Gossip,
+    GossipVote,
+    Match,
+    Message,
+    Post,
+    Report,
+    StatCounter,
+    User,
+)
+from .upsert import insert_for
+
+
+# Metrics bumped outside this module (core statements and plan purchases);
+# import these rather than spelling the names, which would silently start a
+# new counter on a typo
+POSTS = "posts"
+MATCHES = "matches"
+SUBSCRIPTIONS = "subscriptions"
+
+# Metrics shown on the dashboard, in display order
+METRICS = (
+    "users",
+    POSTS,
+    "gossips",
+    "votes",
+    "messages",
+    MATCHES,
+    "reports",
+    SUBSCRIPTIONS,
+    "events",
+)
+
+# Totals only (no daily series): reports not yet resolved, banned users
+REPORTS_OPEN = "reports_open"
+USERS_BANNED = "users_banned"
+
+# Rows each (day, metric) / metric counter is spread over
+SHARDS = 8
+
+# Tables whose ORM inserts and deletes are counted automatically.
+# Inserts done with core statements (matches, bulk deletes) call bump().
+_TRACKED = {
+    User: "users",
+    Post: POSTS,
+    Gossip: "gossips",
+    GossipVote: "votes",
+    Message: "messages",
+    Match: MATCHES,
+    Report: "reports",
+    Event: "events",
+}
+
+
+def _upsert(model, key: dict, column: str, amount: int, connection):
+    stmt = insert_for(model).values(**key, **{column: amount})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={column: getattr(model.__table__.c, column) + amount},
+    )
+    connection.execute(stmt)
+
+
+def bump(metric: str, amount: int = 1, day: date | None = None, daily: bool = True,
+         connection=None):
+    """
+    Add `amount` to a metric's running total and, if `daily`, to its count
+    for `day` (default today), inside the current transaction: the stats
+    commit or roll back together with the change they count.
+    """
+    connection = connection or db.session
+    shard = random.randrange(SHARDS)
+    if daily:
+        _upsert(DailyStat, {"day": day or date.today(), "metric": metric, "shard": shard},
+                "count", amount, connection)
+    _upsert(StatCounter, {"metric": metric, "shard": shard}, "value", amount, connection)
+
+
+# -------------------------------------------------
+# Automatic counting of ORM inserts / deletes
+# -------------------------------------------------
+def _created_day(target) -> date:
+    created_at = getattr(target, "created_at", None)
+    return (created_at or datetime.utcnow()).date()
+
+
+def _on_insert(metric):
+    def listener(mapper, connection, target):
+        bump(metric, day=_created_day(target), connection=connection)
+        if isinstance(target, Report) and not target.resolved:
+            bump(REPORTS_OPEN, daily=False, connection=connection)
+        if isinstance(target, User) and target.is_banned:
+            bump(USERS_BANNED, daily=False, connection=connection)
+    return listener
+
+
+def _on_delete(metric):
+    # Daily counts record what was created that day, so only totals go down
+    def listener(mapper, connection, target):
+        bump(metric, -1, daily=False, connection=connection)
+        if isinstance(target, Report) and not target.resolved:
+            bump(REPORTS_OPEN, -1, daily=False, connection=connection)
+        if isinstance(target, User) and target.is_banned:
+            bump(USERS_BANNED, -1, daily=False, connection=connection)
+    return listener
+
+
+for _model, _metric in _TRACKED.items():
+    event.listen(_model, "after_insert", _on_insert(_metric))
+    event.listen(_model, "after_delete", _on_delete(_metric))
+
+
+def _flag_flipped(target, attr: str) -> int:
+    """+1 / -1 if a boolean column was switched on / off in this flush, else 0."""
+    history = inspect(target).attrs[attr].history
+    if not history.has_changes():
+        return 0
+    was = bool(history.deleted[0]) if history.deleted else False
+    now = bool(getattr(target, attr))
+    return (now > was) - (now < was)
+
+
+@event.listens_for(Report, "after_update")
+def _report_updated(mapper, connection, target):
+    flipped = _flag_flipped(target, "resolved")
+    if flipped:
+        bump(REPORTS_OPEN, -flipped, daily=False, connection=connection)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    flipped = _flag_flipped(target, "is_banned")
+    if flipped:
+        bump(USERS_BANNED, flipped, daily=False, connection=connection)
+
+
+# -------------------------------------------------
+# Reading
+# -------------------------------------------------
+def totals() -> dict[str, int]:
+    """metric -> running total, from one scan of the small counter table."""
+    rows = (
+        db.session.query(StatCounter.metric, func.sum(StatCounter.value))
+        .group_by(StatCounter.metric)
+        .all()
+    )
+    values = {metric: 0 for metric in METRICS + (REPORTS_OPEN, USERS_BANNED)}
+    values.update({metric: int(total or 0) for metric, total in rows})
+    return values
+
+
+def daily_series(start: date, end: date, metrics=METRICS) -> dict[str, list[int]]:
+    """
+    metric -> counts for every day from start to end inclusive (zeros
+    filled in), read from the primary key range of daily_stat.
+    """
+    rows = (
+        db.session.query(DailyStat.day, DailyStat.metric, func.sum(DailyStat.count))
+        .filter(DailyStat.day >= start, DailyStat.day <= end, DailyStat.metric.in_(metrics))
+        .group_by(DailyStat.day, DailyStat.metric)
+        .all()
+    )
+    days = (end - start).days + 1
+    series = {metric: [0] * days for metric in metrics}
+    for day, metric, count in rows:
+        series[metric][(day - start).days] = int(count or 0)
+    return series
+
+
+def day_range(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+# -------------------------------------------------
+# Rebuilding from the base tables
+# -------------------------------------------------
+def rebuild_stats() -> dict[str, int]:
+    """
+    Recompute every counter from the base tables (initial backfill, or
+    repair after bulk SQL run outside the app). Scans each table once;
+    writes landing meanwhile can be lost, so run it while traffic is low.
+    Returns the new totals.
+    """
+    DailyStat.query.delete(synchronize_session=False)
+    StatCounter.query.delete(synchronize_session=False)
+
+    for model, metric in _TRACKED.items():
+        created = getattr(model, "created_at", None)
+        if created is not None:
+            day = func.date(created)
+            for day_value, count in (
+                db.session.query(day, func.count()).select_from(model).group_by(day)
+            ):
+                if day_value is None:
+                    continue
+                if isinstance(day_value, str):  # SQLite returns date() as text
+                    day_value = date.fromisoformat(day_value)
+                db.session.add(DailyStat(day=day_value, metric=metric, shard=0, count=count))
+        total = db.session.query(func.count()).select_from(model).scalar()
+        db.session.add(StatCounter(metric=metric, shard=0, value=total))
+
+    # Subscription purchases leave no history behind; count current paid plans
+    paid = User.query.filter(User.plan.in_(("plus", "pro"))).count()
+    db.session.add(StatCounter(metric=SUBSCRIPTIONS, shard=0, value=paid))
+    open_reports = Report.query.filter(Report.resolved.is_(False)).count()
+    db.session.add(StatCounter(metric=REPORTS_OPEN, shard=0, value=open_reports))
+    banned = User.query.filter(User.is_banned.is_(True)).count()
+    db.session.add(StatCounter(metric=USERS_BANNED, shard=0, value=banned))
+
+    db.session.commit()
+    return totals()
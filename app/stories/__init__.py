@@ -1,3 +1,3 @@
 from flask import Blueprint
 stories_bp = Blueprint("stories", __name__, url_prefix="/stories")
-from . import routes
+from . import routes, commands  # noqa
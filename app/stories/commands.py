@@ -0,0 +1,13 @@
+import click
+
+from . import stories_bp
+from .reaper import REAP_BATCH, reap_expired_stories
+
+
+@stories_bp.cli.command("reap")
+@click.option("--batch-size", default=REAP_BATCH, show_default=True)
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches.")
+def reap_command(batch_size, max_batches):
+    """Delete expired stories and their unreferenced media files."""
+    stories, files = reap_expired_stories(batch_size=batch_size, max_batches=max_batches)
+    click.echo(f"Deleted {stories} expired stories and {files} media files.")
@@ -0,0 +1,83 @@
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func
+
+from ..extensions import db
+from ..models import Story, User
+
+
+# Each worker reloads from the database this often, to pick up stories
+# uploaded through other workers
+RELOAD_SECONDS = 60
+
+
+class StoryRingEntry:
+    """One bubble of the feed's story ring: a user with an active story."""
+
+    __slots__ = ("id", "name", "photo", "expires_at")
+
+    def __init__(self, id, name, photo, expires_at):
+        self.id = id
+        self.name = name
+        self.photo = photo
+        self.expires_at = expires_at  # when the user's last active story expires
+
+
+class ActiveStoriesIndex:
+    """
+    Users with at least one unexpired story, kept in process memory so the
+    feed can draw its story ring without querying. Entries carry the expiry
+    of the user's latest story and are skipped (and dropped) once it has
+    passed; the whole index is reloaded every RELOAD_SECONDS.
+    """
+
+    def __init__(self, reload_seconds=RELOAD_SECONDS):
+        self.reload_seconds = reload_seconds
+        self._entries = {}  # user_id -> StoryRingEntry
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _load(self, now: datetime):
+        rows = (
+            db.session.query(User.id, User.name, User.photo, func.max(Story.expires_at))
+            .join(Story, Story.user_id == User.id)
+            .filter(Story.expires_at > now)
+            .group_by(User.id, User.name, User.photo)
+            .all()
+        )
+        self._entries = {row[0]: StoryRingEntry(*row) for row in rows}
+        self._loaded_at = time.monotonic()
+
+    def _fresh_entries(self, now: datetime) -> dict:
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_seconds:
+                self._load(now)
+            expired = [uid for uid, e in self._entries.items() if e.expires_at <= now]
+            for uid in expired:
+                del self._entries[uid]
+            return dict(self._entries)
+
+    def ring(self, viewer_id: int, now: datetime | None = None):
+        """
+        (viewer's own entry or None, other users' entries newest story first)
+        """
+        entries = self._fresh_entries(now or datetime.utcnow())
+        mine = entries.pop(viewer_id, None)
+        others = sorted(entries.values(), key=lambda e: (e.expires_at, e.id), reverse=True)
+        return mine, others
+
+    def add(self, user, expires_at: datetime):
+        """Record a story just committed by `user` in this worker's index."""
+        with self._lock:
+            entry = self._entries.get(user.id)
+            if entry is None or entry.expires_at < expires_at:
+                self._entries[user.id] = StoryRingEntry(user.id, user.name, user.photo, expires_at)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+active_stories = ActiveStoriesIndex()
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from ..extensions import db
+from ..models import Story, User
+from ..tasks import periodic
+from ..uploads import delete_upload
+
+
+# Stories deleted per transaction
+REAP_BATCH = 500
+
+# How often the in-process reaper runs (see app/tasks.py)
+REAP_INTERVAL_SECONDS = 300
+
+
+def _unreferenced(filenames: set[str]) -> set[str]:
+    """The subset of filenames no remaining story or profile photo uses.
+    Uploads are content-addressed, so one file can back several rows."""
+    if not filenames:
+        return set()
+    in_use = {
+        row[0]
+        for row in db.session.query(Story.media).filter(Story.media.in_(filenames))
+    }
+    in_use.update(
+        row[0]
+        for row in db.session.query(User.photo).filter(User.photo.in_(filenames))
+    )
+    return filenames - in_use
+
+
+def reap_expired_stories(batch_size: int = REAP_BATCH, max_batches: int | None = None,
+                         now: datetime | None = None):
+    """
+    Delete expired stories oldest first, `batch_size` rows per transaction
+    (walking ix_story_expires_at), then remove the media files nothing
+    references any more. Safe to run from several processes at once, and
+    alongside uploads: delete_upload() keeps a file that an identical
+    upload reused after the reference check.
+
+    Returns (stories_deleted, files_deleted).
+    """
+    now = now or datetime.utcnow()
+    stories_deleted = files_deleted = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        rows = (
+            db.session.query(Story.id, Story.media)
+            .filter(Story.expires_at <= now)
+            .order_by(Story.expires_at)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        stories_deleted += Story.query.filter(
+            Story.id.in_([row.id for row in rows])
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+        # Files go only after the rows are committed: a failure in between
+        # leaves an orphaned file, never a story pointing at a missing one
+        for filename in _unreferenced({row.media for row in rows}):
+            files_deleted += delete_upload(filename)
+
+        batches += 1
+        if len(rows) < batch_size:
+            break
+
+    return stories_deleted, files_deleted
+
+
+@periodic("reap-stories", REAP_INTERVAL_SECONDS)
+def reap_task():
+    reap_expired_stories()
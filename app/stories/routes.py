@@ -1,10 +1,11 @@
-import os
 from datetime import datetime, timedelta
-from flask import render_template, request, redirect, url_for, flash, current_app
+from flask import render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from . import stories_bp
 from ..extensions import db
 from ..models import Story
+from ..uploads import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, UploadRejected, media_url, save_upload
+from .index import active_stories
 
 
 @stories_bp.route("/upload", methods=["POST"])
@@ -15,9 +16,11 @@ def upload_story():
         flash("No file selected.", "danger")
         return redirect(url_for("main.feed"))
 
-    filename = f"story_{current_user.id}_{file.filename}"
-    path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    file.save(path)
+    try:
+        filename = save_upload(file, allowed=IMAGE_EXTENSIONS | VIDEO_EXTENSIONS)
+    except UploadRejected as e:
+        flash(str(e), "danger")
+        return redirect(url_for("main.feed"))
 
     story = Story(
         user_id=current_user.id,
@@ -26,6 +29,7 @@ def upload_story():
     )
     db.session.add(story)
     db.session.commit()
+    active_stories.add(current_user, story.expires_at)
 
     flash("Story uploaded!", "success")
     return redirect(url_for("main.feed"))
@@ -40,7 +44,7 @@ def view_story(user_id):
     ).order_by(Story.created_at.asc()).all()
 
     story_urls = [
-        url_for("static", filename="uploads/" + s.media)
+        media_url(s.media, 1080)
         for s in stories
     ]
 
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
 from .extensions import db
+from .stats import SUBSCRIPTIONS, bump
+from .user_cache import invalidate_user
 
 PLANS = {
     "free": {
@@ -40,4 +42,6 @@ def apply_plan(user, plan_key: str):
         user.plan_expires_at = None
     else:
         user.plan_expires_at = datetime.utcnow() + timedelta(days=plan_duration_days())
+        bump(SUBSCRIPTIONS)
     db.session.commit()
+    invalidate_user(user.id)
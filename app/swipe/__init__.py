@@ -2,4 +2,4 @@ from flask import Blueprint
 
 swipe_bp = Blueprint("swipe", __name__, url_prefix="/swipe")
 
-from . import routes  # noqa
+from . import routes, commands  # noqa
@@ -0,0 +1,13 @@
+import click
+
+from . import swipe_bp
+from .matching import normalize_pairs
+
+
+@swipe_bp.cli.command("normalize-pairs")
+def normalize_pairs_command():
+    """Dedupe likes / matches and store match pairs canonically (run once when upgrading)."""
+    counts = normalize_pairs()
+    click.echo(f"Deleted {counts['duplicate_likes']} duplicate likes.")
+    click.echo(f"Merged {counts['duplicate_matches']} duplicate matches.")
+    click.echo(f"Swapped {counts['swapped_matches']} matches to (min id, max id).")
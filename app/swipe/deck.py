@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict, deque
+
+from sqlalchemy import and_, exists, or_
+
+from ..extensions import db
+from ..models import User, Like, Match
+from .scoring import rank_candidates
+
+
+# Candidates fetched (and ranked against each other) per refill,
+# and the queue length that triggers one
+DECK_BATCH = 200
+DECK_LOW_WATER = 5
+
+# Decks kept in memory per worker; least recently used are dropped
+MAX_DECKS = 5000
+
+
+class _Deck:
+    __slots__ = ("queue", "cursor")
+
+    def __init__(self):
+        self.queue = deque()
+        self.cursor = 0  # highest user id fetched so far (keyset)
+
+
+def candidate_ids(user_id: int, after_id: int, limit: int) -> list[int]:
+    """
+    Next `limit` user ids after `after_id` that `user_id` can still swipe on:
+    not themselves, not banned, not already liked, not already matched.
+    Walks the user primary key from the cursor, so each refill only looks
+    at about one batch of rows instead of anti-joining the whole table.
+    """
+    liked = exists().where(
+        Like.from_user_id == user_id,
+        Like.to_user_id == User.id,
+    )
+    matched = exists().where(
+        or_(
+            and_(Match.user1_id == user_id, Match.user2_id == User.id),
+            and_(Match.user2_id == user_id, Match.user1_id == User.id),
+        )
+    )
+    rows = (
+        db.session.query(User.id)
+        .filter(
+            User.id > after_id,
+            User.id != user_id,
+            or_(User.is_banned.is_(False), User.is_banned.is_(None)),
+            ~liked,
+            ~matched,
+        )
+        .order_by(User.id)
+        .limit(limit)
+        .all()
+    )
+    return [row.id for row in rows]
+
+
+def swipeable_user(user_id: int, candidate_id: int):
+    """
+    The candidate's User if `user_id` can still swipe on them, else None.
+    Decks are per worker, so a like or match recorded through another
+    worker never reaches this worker's copy; every card is re-checked when
+    it is shown. Both checks are point lookups, on the unique like index
+    and the canonical-pair match index.
+    """
+    if candidate_id == user_id:
+        return None
+    user1_id, user2_id = Match.pair(user_id, candidate_id)
+    liked = exists().where(Like.from_user_id == user_id, Like.to_user_id == candidate_id)
+    matched = exists().where(Match.user1_id == user1_id, Match.user2_id == user2_id)
+    return User.query.filter(
+        User.id == candidate_id,
+        or_(User.is_banned.is_(False), User.is_banned.is_(None)),
+        ~liked,
+        ~matched,
+    ).first()
+
+
+class SwipeDeckStore:
+    """
+    Per-user queues of swipe candidates, kept in process memory.
+
+    Showing the next card and consuming it are O(1) deque operations; the
+    database is only hit when a deck runs low, and then for one keyset
+    batch, which is ordered by compatibility (see scoring.py) before it is
+    queued. Queued ids may go stale (see swipeable_user). Skips are
+    deliberately not persisted: a skip is "not now", not an exclusion like
+    a like or a match, so once the user table has been walked to the end
+    the cursor wraps and skipped users come round again.
+    """
+
+    def __init__(self, batch=DECK_BATCH, low_water=DECK_LOW_WATER, max_decks=MAX_DECKS):
+        self.batch = batch
+        self.low_water = low_water
+        self.max_decks = max_decks
+        self._decks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _deck(self, user_id: int) -> _Deck:
+        deck = self._decks.get(user_id)
+        if deck is None:
+            deck = self._decks[user_id] = _Deck()
+            while len(self._decks) > self.max_decks:
+                self._decks.popitem(last=False)
+        else:
+            self._decks.move_to_end(user_id)
+        return deck
+
+    def _refill(self, user_id: int, deck: _Deck):
+        # Runs outside the lock: a slow query must not stall other users.
+        # Concurrent refills of the same deck are harmless, duplicates are
+        # dropped when queueing.
+        cursor = deck.cursor
+        ids = candidate_ids(user_id, cursor, self.batch)
+        if ids:
+            cursor = ids[-1]
+        if len(ids) < self.batch and deck.cursor:
+            # End of the table: wrap round for the rest of the batch
+            wrapped = candidate_ids(user_id, 0, self.batch - len(ids))
+            cursor = wrapped[-1] if wrapped else 0
+            ids += wrapped
+        # Best matches of the batch first
+        ids = rank_candidates(user_id, ids)
+
+        with self._lock:
+            deck.cursor = cursor
+            queued = set(deck.queue)
+            for candidate_id in ids:
+                if candidate_id not in queued:
+                    deck.queue.append(candidate_id)
+                    queued.add(candidate_id)
+
+    def peek(self, user_id: int) -> int | None:
+        """Id of the next candidate to show, refilling the deck if low."""
+        with self._lock:
+            deck = self._deck(user_id)
+            low = len(deck.queue) < self.low_water
+        if low:
+            self._refill(user_id, deck)
+        with self._lock:
+            return deck.queue[0] if deck.queue else None
+
+    def discard(self, user_id: int, candidate_id: int):
+        """Remove a candidate once it has been liked, skipped or found invalid."""
+        with self._lock:
+            deck = self._decks.get(user_id)
+            if deck is None:
+                return
+            if deck.queue and deck.queue[0] == candidate_id:
+                deck.queue.popleft()
+            else:
+                try:
+                    deck.queue.remove(candidate_id)
+                except ValueError:
+                    pass
+
+    def reset(self, user_id: int):
+        with self._lock:
+            self._decks.pop(user_id, None)
+
+
+decks = SwipeDeckStore()
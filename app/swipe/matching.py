@@ -0,0 +1,158 @@
+from datetime import datetime
+
+from sqlalchemy import and_, case, delete, exists, func, select, text, update
+
+from ..extensions import db
+from ..models import Like, Match, Message
+from ..stats import MATCHES, bump
+from ..upsert import insert_for
+
+
+def _lock_pair(a: int, b: int):
+    """
+    Serialize concurrent likes between the same two users, so two people
+    liking each other at the same moment can't both miss the other's like.
+    SQLite already serializes writers; on PostgreSQL a transaction-scoped
+    advisory lock on the canonical pair does it without touching user rows.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        user1_id, user2_id = Match.pair(a, b)
+        db.session.execute(
+            text("SELECT pg_advisory_xact_lock(:a, :b)"),
+            {"a": user1_id, "b": user2_id},
+        )
+
+
+def record_like(from_user_id: int, to_user_id: int, mode: str = "dating"):
+    """
+    Record a like and create the match if it is reciprocated, as part of the
+    caller's transaction (nothing is committed here).
+
+    Duplicate likes and matches are absorbed by the unique indexes via
+    ON CONFLICT DO NOTHING rather than checked for first.
+
+    Returns (like_created, match_id); match_id is set only when this like
+    created a new match.
+    """
+    _lock_pair(from_user_id, to_user_id)
+    now = datetime.utcnow()
+
+    like_id = db.session.execute(
+        insert_for(Like)
+        .values(from_user_id=from_user_id, to_user_id=to_user_id, mode=mode, created_at=now)
+        .on_conflict_do_nothing(index_elements=["from_user_id", "to_user_id", "mode"])
+        .returning(Like.id)
+    ).scalar()
+
+    # Reverse lookup is a point query on the same unique index
+    reciprocated = db.session.query(
+        exists().where(
+            Like.from_user_id == to_user_id,
+            Like.to_user_id == from_user_id,
+            Like.mode == mode,
+        )
+    ).scalar()
+    if not reciprocated:
+        return like_id is not None, None
+
+    user1_id, user2_id = Match.pair(from_user_id, to_user_id)
+    match_id = db.session.execute(
+        insert_for(Match)
+        .values(
+            user1_id=user1_id,
+            user2_id=user2_id,
+            mode=mode,
+            created_at=now,
+            last_message_at=now,
+        )
+        .on_conflict_do_nothing(index_elements=["user1_id", "user2_id", "mode"])
+        .returning(Match.id)
+    ).scalar()
+    if match_id:
+        # Core insert: not seen by the ORM stats listeners
+        bump(MATCHES, day=now.date())
+    return like_id is not None, match_id
+
+
+
+# -------------------------------------------------
+# One-off upgrade of rows written before the constraints
+# -------------------------------------------------
+def normalize_pairs() -> dict:
+    """
+    Bring likes and matches recorded before uq_like_from_to_mode,
+    ck_match_canonical_pair and uq_match_pair_mode in line with them, in
+    one transaction: duplicate likes are deleted (the first one is kept),
+    duplicate matches of a pair and mode are merged into the first one
+    (their messages are moved to it), then every remaining match is
+    stored as (min id, max id). Safe to run again; returns what changed.
+    """
+    duplicate_likes = db.session.execute(
+        delete(Like)
+        .where(
+            Like.id.notin_(
+                select(func.min(Like.id)).group_by(Like.from_user_id, Like.to_user_id, Like.mode)
+            )
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    low = case((Match.user1_id < Match.user2_id, Match.user1_id), else_=Match.user2_id)
+    high = case((Match.user1_id < Match.user2_id, Match.user2_id), else_=Match.user1_id)
+    firsts = (
+        select(low.label("low"), high.label("high"), Match.mode, func.min(Match.id).label("keep_id"))
+        .group_by(low, high, Match.mode)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    merged = {}  # kept match id -> ids of its duplicates
+    for match_id, keep_id in db.session.execute(
+        select(Match.id, firsts.c.keep_id).join(
+            firsts,
+            and_(
+                low == firsts.c.low,
+                high == firsts.c.high,
+                Match.mode.is_not_distinct_from(firsts.c.mode),
+                Match.id != firsts.c.keep_id,
+            ),
+        )
+    ):
+        merged.setdefault(keep_id, []).append(match_id)
+
+    duplicate_ids = [match_id for ids in merged.values() for match_id in ids]
+    for keep_id, ids in merged.items():
+        db.session.execute(
+            update(Message)
+            .where(Message.match_id.in_(ids))
+            .values(match_id=keep_id)
+            .execution_options(synchronize_session=False)
+        )
+    if duplicate_ids:
+        db.session.execute(
+            delete(Match)
+            .where(Match.id.in_(duplicate_ids))
+            .execution_options(synchronize_session=False)
+        )
+        bump(MATCHES, -len(duplicate_ids), daily=False)
+
+    # SET reads the row as it was, so the two sides swap in one statement
+    swapped = db.session.execute(
+        update(Match)
+        .where(Match.user1_id > Match.user2_id)
+        .values(
+            user1_id=Match.user2_id,
+            user2_id=Match.user1_id,
+            user1_last_read_id=Match.user2_last_read_id,
+            user2_last_read_id=Match.user1_last_read_id,
+            user1_unread=Match.user2_unread,
+            user2_unread=Match.user1_unread,
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    db.session.commit()
+    return {
+        "duplicate_likes": duplicate_likes,
+        "duplicate_matches": len(duplicate_ids),
+        "swapped_matches": swapped,
+    }
@@ -1,43 +1,57 @@
 from flask import render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
 from . import swipe_bp
-from ..models import User, Like, Match
-from ..subscriptions import get_plan
+from ..models import User
+from ..quota import consume_swipe
 from ..extensions import db
+from .deck import decks, swipeable_user
+from .matching import record_like
 
 
 @swipe_bp.route("/")
 @login_required
 def swipe_view():
-    # Very simple: show the first other user
-    candidate = User.query.filter(User.id != current_user.id).first()
+    # Next card from this user's deck; one indexed point query per swipe
+    candidate = None
+    while True:
+        candidate_id = decks.peek(current_user.id)
+        if candidate_id is None:
+            break
+        candidate = swipeable_user(current_user.id, candidate_id)
+        if candidate:
+            break
+        # Deleted, banned, liked or matched since it was queued
+        decks.discard(current_user.id, candidate_id)
+
     return render_template("swipe/swipe.html", candidate=candidate)
 
 
+@swipe_bp.route("/skip/<int:user_id>")
+@login_required
+def skip_user(user_id):
+    decks.discard(current_user.id, user_id)
+    return redirect(url_for("swipe.swipe_view"))
+
+
 @swipe_bp.route("/like/<int:user_id>")
 @login_required
 def like_user(user_id):
-    plan = get_plan(current_user.plan or "free")
-    limit = plan["swipes_per_day"]
-
-    if not current_user.can_swipe_today(limit):
+    other = User.query.get_or_404(user_id)
+    if other.id == current_user.id:
+        decks.discard(current_user.id, other.id)
+        return redirect(url_for("swipe.swipe_view"))
+
+    # Like, reciprocity check, match and quota count: one transaction.
+    # Only new likes spend quota; over the limit the like is rolled back.
+    like_created, match_id = record_like(current_user.id, other.id, mode="dating")
+    if like_created and not consume_swipe(current_user):
+        db.session.rollback()
         flash("You reached your daily swipe limit. Upgrade your plan!", "warning")
         return redirect(url_for("billing.pricing"))
-
-    # register swipe
-    current_user.register_swipe()
-
-    other = User.query.get_or_404(user_id)
-    like = Like(from_user_id=current_user.id, to_user_id=other.id, mode="dating")
-    db.session.add(like)
     db.session.commit()
+    decks.discard(current_user.id, other.id)
 
-    # check reverse like for match
-    reverse = Like.query.filter_by(from_user_id=other.id, to_user_id=current_user.id, mode="dating").first()
-    if reverse:
-        match = Match(user1_id=current_user.id, user2_id=other.id, mode="dating")
-        db.session.add(match)
-        db.session.commit()
+    if match_id:
         flash("It's a match! You can now chat.", "success")
         return redirect(url_for("chat.matches"))
 
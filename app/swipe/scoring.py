@@ -0,0 +1,209 @@
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+
+from ..extensions import db
+from ..models import User
+from ..tasks import periodic
+
+
+# Weights of each signal in the compatibility score
+W_INTEREST = 3.0      # per shared interest
+W_LOOKING_FOR = 2.0   # per shared "looking for" goal
+W_BRANCH = 1.5        # same branch
+W_YEAR = 1.0          # same year
+
+# Only the most common interests get a bit; the long tail of one-off
+# free-text entries would widen every row without changing rankings.
+MAX_INTERESTS = 256
+MAX_LOOKING_FOR = 32
+
+# How often the index is rebuilt from the database. With background tasks
+# running, a periodic task builds the new index off-request and swaps it
+# in; otherwise (CLI, tests) it is rebuilt inline once this old.
+INDEX_TTL_SECONDS = 600
+
+# Above this share of the index, scoring every user and picking the
+# candidates out is cheaper than gathering the candidate rows first
+_FULL_SCAN_RATIO = 0.125
+
+# popcount of every byte value, for NumPy < 2.0 without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def split_tags(value: str | None) -> list[str]:
+    """"hackathons, Dance" -> ["hackathons", "dance"]"""
+    if not value:
+        return []
+    return [t.strip().lower() for t in value.split(",") if t.strip()]
+
+
+def _vocabulary(tag_lists, limit: int) -> dict[str, int]:
+    counts = {}
+    for tags in tag_lists:
+        for tag in tags:
+            counts[tag] = counts.get(tag, 0) + 1
+    common = sorted(counts, key=lambda t: (-counts[t], t))[:limit]
+    return {tag: bit for bit, tag in enumerate(common)}
+
+
+def _pack(tag_lists, vocab: dict[str, int]) -> np.ndarray:
+    """Multi-hot encode tag lists as bitsets: shape (n, ceil(v/64)) uint64."""
+    width = max((len(vocab) + 63) // 64, 1) * 64
+    bits = np.zeros((len(tag_lists), width), dtype=bool)
+    for row, tags in enumerate(tag_lists):
+        cols = [vocab[t] for t in tags if t in vocab]
+        bits[row, cols] = True
+    return np.ascontiguousarray(np.packbits(bits, axis=1)).view(np.uint64)
+
+
+def _shared_bits(rows: np.ndarray, mine: np.ndarray) -> np.ndarray:
+    """Number of bits each bitset row has in common with `mine`."""
+    shared = rows & mine
+    if hasattr(np, "bitwise_count"):
+        counts = np.bitwise_count(shared)
+    else:
+        counts = _POPCOUNT[shared.view(np.uint8)]
+    total = counts[:, 0].astype(np.float32)
+    for col in range(1, counts.shape[1]):
+        total += counts[:, col]
+    return total
+
+
+def _codes(values) -> np.ndarray:
+    """Categorical strings -> small int codes, -1 for missing."""
+    table = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        key = (value or "").strip().lower()
+        codes[i] = table.setdefault(key, len(table)) if key else -1
+    return codes
+
+
+class CompatibilityIndex:
+    """
+    Every user's interests, goals, branch and year as compact arrays:
+    interests and looking_for are packed uint64 bitsets (one bit per known
+    tag), branch and year are int codes. Scoring one user against any set of
+    candidates is a handful of whole-array NumPy operations.
+    """
+
+    def __init__(self, ids, interests, looking_for, branch, year):
+        order = np.argsort(ids, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.interests = interests[order]
+        self.looking_for = looking_for[order]
+        self.branch = branch[order]
+        self.year = year[order]
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: iterable of (id, interests, looking_for, branch, year)."""
+        rows = list(rows)
+        interest_lists = [split_tags(r[1]) for r in rows]
+        looking_lists = [split_tags(r[2]) for r in rows]
+        return cls(
+            ids=[r[0] for r in rows],
+            interests=_pack(interest_lists, _vocabulary(interest_lists, MAX_INTERESTS)),
+            looking_for=_pack(looking_lists, _vocabulary(looking_lists, MAX_LOOKING_FOR)),
+            branch=_codes([r[3] for r in rows]),
+            year=_codes([r[4] for r in rows]),
+        )
+
+    @classmethod
+    def from_db(cls):
+        rows = db.session.query(
+            User.id, User.interests, User.looking_for, User.branch, User.year
+        ).all()
+        return cls.from_rows(rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows(self, user_ids) -> tuple[np.ndarray, np.ndarray]:
+        """Row positions of user_ids, plus a mask of ids that are indexed."""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        pos = np.searchsorted(self.ids, user_ids)
+        pos = np.minimum(pos, max(len(self.ids) - 1, 0))
+        found = self.ids[pos] == user_ids if len(self.ids) else np.zeros(len(user_ids), bool)
+        return pos, found
+
+    def _score_rows(self, me: int, pos) -> np.ndarray:
+        """Scores of the rows at `pos` (a slice or an index array) against row `me`."""
+        branch, year = self.branch[pos], self.year[pos]
+        return (
+            W_INTEREST * _shared_bits(self.interests[pos], self.interests[me])
+            + W_LOOKING_FOR * _shared_bits(self.looking_for[pos], self.looking_for[me])
+            + W_BRANCH * ((branch == self.branch[me]) & (self.branch[me] >= 0))
+            + W_YEAR * ((year == self.year[me]) & (self.year[me] >= 0))
+        )
+
+    def scores(self, user_id: int, candidate_ids) -> np.ndarray:
+        """Compatibility of user_id with each candidate (0 for unknown users)."""
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        out = np.zeros(len(candidate_ids), dtype=np.float32)
+        if not len(candidate_ids) or not len(self.ids):
+            return out
+
+        (me,), (me_found,) = self._rows([user_id])
+        if not me_found:
+            return out
+        pos, found = self._rows(candidate_ids)
+
+        if len(candidate_ids) > _FULL_SCAN_RATIO * len(self.ids):
+            out[found] = self._score_rows(me, slice(None))[pos[found]]
+        else:
+            out[found] = self._score_rows(me, pos[found])
+        return out
+
+    def rank(self, user_id: int, candidate_ids) -> list[int]:
+        """
+        candidate_ids ordered best match first (ties keep their order).
+        Only the given ids are compared: the deck passes one keyset batch in
+        id order, so the best match of the batch leads, not of all users.
+        """
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        if len(candidate_ids) < 2:
+            return candidate_ids.tolist()
+        order = np.argsort(-self.scores(user_id, candidate_ids), kind="stable")
+        return candidate_ids[order].tolist()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _stale(index) -> bool:
+    return index is None or time.monotonic() - index.built_at > INDEX_TTL_SECONDS
+
+
+def get_index() -> CompatibilityIndex:
+    """
+    The process-wide index. Requests never wait on a rebuild while the
+    periodic task keeps it fresh; they only build it inline the first time
+    a worker needs it, or when no background tasks are running.
+    """
+    global _index
+    background = bool(current_app.extensions.get("periodic_tasks"))
+    index = _index
+    if index is not None and (background or not _stale(index)):
+        return index
+    with _index_lock:
+        if _index is None or (not background and _stale(_index)):
+            _index = CompatibilityIndex.from_db()
+        return _index
+
+
+@periodic("rebuild-compatibility-index", INDEX_TTL_SECONDS)
+def rebuild_index_task():
+    # Built outside the lock while requests keep ranking with the old
+    # index, then swapped in with one assignment
+    global _index
+    _index = CompatibilityIndex.from_db()
+
+
+def rank_candidates(user_id: int, candidate_ids) -> list[int]:
+    return get_index().rank(user_id, candidate_ids)
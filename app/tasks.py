@@ -0,0 +1,66 @@
+import logging
+import os
+import random
+import threading
+
+from .extensions import db
+
+
+log = logging.getLogger(__name__)
+
+# name -> (interval seconds, func); filled by @periodic at import time
+_registry = {}
+
+
+def periodic(name: str, seconds: float):
+    """
+    Register a function to be run every `seconds` inside the app context by
+    a daemon thread. Only started when RUN_BACKGROUND_TASKS is set, so CLI
+    commands and tests don't spawn threads. Every worker process runs its
+    own copy, so tasks must be safe to run concurrently.
+    """
+    def decorator(func):
+        _registry[name] = (seconds, func)
+        return func
+    return decorator
+
+
+class PeriodicTask(threading.Thread):
+    def __init__(self, app, name, seconds, func):
+        super().__init__(name=f"task-{name}", daemon=True)
+        self.app = app
+        self.seconds = seconds
+        self.func = func
+        self.stopped = threading.Event()
+
+    def run(self):
+        # Spread the first run so workers booted together don't run in lockstep
+        if self.stopped.wait(random.uniform(0, self.seconds)):
+            return
+        while True:
+            with self.app.app_context():
+                try:
+                    self.func()
+                except Exception:
+                    log.exception("Periodic task %s failed", self.name)
+                finally:
+                    db.session.remove()
+            if self.stopped.wait(self.seconds):
+                return
+
+    def stop(self):
+        self.stopped.set()
+
+
+def init_app(app):
+    """Start every registered task if background tasks are enabled."""
+    enabled = app.config.get(
+        "RUN_BACKGROUND_TASKS", os.environ.get("RUN_BACKGROUND_TASKS") == "1"
+    )
+    app.extensions["periodic_tasks"] = []
+    if not enabled:
+        return
+    for name, (seconds, func) in _registry.items():
+        task = PeriodicTask(app, name, seconds, func)
+        task.start()
+        app.extensions["periodic_tasks"].append(task)
@@ -0,0 +1,266 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app, flash, redirect, request, url_for
+
+from .cache import LRUCache
+
+try:  # Pillow is optional: without it originals are simply served as-is
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = None
+
+
+log = logging.getLogger(__name__)
+
+# Largest request body accepted (enforced by Werkzeug while streaming)
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+VIDEO_EXTENSIONS = {".mp4", ".webm", ".mov"}
+
+# Still images get resized renditions; GIFs and videos are served as uploaded
+RENDERABLE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Rendition widths (px) and encoding: "<sha256>_<width>.webp"
+RENDITION_WIDTHS = (160, 480, 1080)
+RENDITION_FORMAT = "webp"
+RENDITION_QUALITY = 80
+
+# Processes resizing images; created on first use in each worker
+MEDIA_WORKERS = 2
+
+_CHUNK = 64 * 1024
+
+# Reusing an existing upload touches it, and delete_upload() leaves files
+# touched this recently in place: a save racing the story reaper keeps
+# the file its new row will point at
+REUSE_GRACE_SECONDS = 600
+
+
+class UploadRejected(ValueError):
+    """The uploaded file is empty, too large or of an unsupported type."""
+
+
+def upload_folder() -> str:
+    return current_app.config["UPLOAD_FOLDER"]
+
+
+def rendition_name(filename: str, width: int) -> str:
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}_{width}.{RENDITION_FORMAT}"
+
+
+def rendition_names(filename: str) -> list[str]:
+    """All rendition files a stored upload can have (they may not exist yet)."""
+    if os.path.splitext(filename)[1].lower() not in RENDERABLE_EXTENSIONS:
+        return []
+    return [rendition_name(filename, w) for w in RENDITION_WIDTHS]
+
+
+# -------------------------------------------------
+# Storing uploads
+# -------------------------------------------------
+def save_upload(file, allowed=IMAGE_EXTENSIONS) -> str:
+    """
+    Stream an uploaded FileStorage to the upload folder in chunks, hashing
+    it on the way, and store it as "<sha256><ext>". Identical uploads share
+    one file. Image renditions are queued in the background.
+
+    Returns the stored filename. Raises UploadRejected.
+    """
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext == ".jpeg":
+        ext = ".jpg"
+    if ext not in allowed:
+        raise UploadRejected("Unsupported file type.")
+
+    limit = current_app.config.get("MAX_CONTENT_LENGTH") or MAX_UPLOAD_BYTES
+    folder = upload_folder()
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.stream.read(_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise UploadRejected("File is too large.")
+                digest.update(chunk)
+                out.write(chunk)
+        if not size:
+            raise UploadRejected("File is empty.")
+
+        filename = digest.hexdigest() + ext
+        path = os.path.join(folder, filename)
+        if _reuse(path):
+            os.unlink(tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    schedule_renditions(filename)
+    return filename
+
+
+def _reuse(path: str) -> bool:
+    """Mark an identical stored upload as just used; False if there is none
+    (or the reaper has just taken it), in which case the caller writes it."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def delete_upload(filename: str, grace: float = REUSE_GRACE_SECONDS) -> int:
+    """
+    Remove a stored upload nothing references any more, and its renditions;
+    returns files removed.
+
+    The caller's reference check can race a save_upload() of the same
+    content, which reuses the file and commits a new row pointing at it.
+    So the file is first renamed out of the way (atomic; a reuse after
+    that finds nothing and writes a fresh copy), and put back if it was
+    touched within `grace` seconds, i.e. reused since the check.
+    """
+    folder = upload_folder()
+    path = os.path.join(folder, filename)
+    doomed = os.path.join(folder, f".reap-{os.getpid()}-{filename}")
+    try:
+        os.replace(path, doomed)
+    except FileNotFoundError:
+        return 0  # already gone, or another reaper is deciding
+    if time.time() - os.stat(doomed).st_mtime < grace:
+        os.replace(doomed, path)
+        return 0
+    os.unlink(doomed)
+
+    removed = 1
+    for name in rendition_names(filename):
+        _ready.pop(name)
+        try:
+            os.unlink(os.path.join(upload_folder(), name))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+# -------------------------------------------------
+# Renditions (run in a process pool)
+# -------------------------------------------------
+def _render(path: str, out_dir: str, names_by_width: dict[int, str]):
+    """Write each missing rendition of one image; runs in a pool process."""
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        for width, name in sorted(names_by_width.items(), reverse=True):
+            target = os.path.join(out_dir, name)
+            if os.path.exists(target):
+                continue
+            # Largest first, each downscaled from the previous one
+            img.thumbnail((width, width * 4), Image.LANCZOS)
+            # Write then rename, so a rendition is never served half-written
+            tmp = f"{target}.{os.getpid()}.tmp"
+            img.save(tmp, RENDITION_FORMAT.upper(), quality=RENDITION_QUALITY, method=4)
+            os.replace(tmp, target)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor:
+    # Per process: a pool inherited across a fork (e.g. gunicorn preload)
+    # is not usable in the child
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _log_failure(filename):
+    def callback(future):
+        if future.exception() is not None:
+            log.error("Rendering %s failed: %s", filename, future.exception())
+    return callback
+
+
+def schedule_renditions(filename: str):
+    """Queue the renditions of a stored upload; a no-op without Pillow."""
+    names = rendition_names(filename)
+    if Image is None or not names:
+        return
+    future = _executor().submit(
+        _render,
+        os.path.join(upload_folder(), filename),
+        upload_folder(),
+        dict(zip(RENDITION_WIDTHS, names)),
+    )
+    future.add_done_callback(_log_failure(filename))
+
+
+# -------------------------------------------------
+# Serving
+# -------------------------------------------------
+# Renditions already seen on disk (they are never rewritten in place)
+_ready = LRUCache(maxsize=20000)
+
+
+def _rendition_ready(name: str) -> bool:
+    if _ready.get(name):
+        return True
+    if os.path.exists(os.path.join(upload_folder(), name)):
+        _ready.set(name, True)
+        return True
+    return False
+
+
+def media_file(filename: str, width: int | None = None) -> str:
+    """
+    Stored name to serve for an upload displayed about `width` px wide: the
+    smallest rendition at least that wide once it exists, else the original.
+    """
+    if not filename or not width:
+        return filename
+    names = rendition_names(filename)
+    if not names:
+        return filename
+    for rendition_width, name in zip(RENDITION_WIDTHS, names):
+        if rendition_width >= width:
+            break
+    return name if _rendition_ready(name) else filename
+
+
+def media_url(filename: str | None, width: int | None = None) -> str | None:
+    if not filename:
+        return None
+    return url_for("media.file", filename=media_file(filename, width))
+
+
+def init_app(app):
+    app.config.setdefault("MAX_CONTENT_LENGTH", MAX_UPLOAD_BYTES)
+    app.add_template_global(media_url)
+
+    @app.errorhandler(413)
+    def upload_too_large(e):
+        flash("File is too large.", "danger")
+        return redirect(request.referrer or url_for("main.feed"))
@@ -0,0 +1,33 @@
+from sqlalchemy.engine import make_url
+
+from .extensions import db
+
+
+# Likes, votes, swipe quota and stats are all written with ON CONFLICT
+# upserts, which these dialects provide
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+
+def init_app(app):
+    """Refuse to start on a database the upserts can't run on, rather than
+    failing on the first like or vote."""
+    dialect = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+    if dialect not in SUPPORTED_DIALECTS:
+        raise RuntimeError(
+            f"Unsupported database {dialect!r}: this app needs "
+            f"{' or '.join(SUPPORTED_DIALECTS)} for its ON CONFLICT upserts."
+        )
+
+
+def insert_for(model):
+    """
+    INSERT construct of the session's dialect, so callers can use
+    .on_conflict_do_nothing() / .on_conflict_do_update().
+    PostgreSQL in production, SQLite in local development; other databases
+    are rejected at startup (see init_app).
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
@@ -0,0 +1,94 @@
+import time
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .cache import LRUCache
+from .extensions import db
+from .models import User
+
+
+# Users kept per worker, and how long a row is served before it is read
+# again. Changes made through this worker drop the entry right away; an
+# entry older than USER_VERIFY_SECONDS has its version compared with the
+# database first, which bounds how long a change made through another
+# worker can go unseen.
+USER_CACHE_SIZE = 10000
+USER_CACHE_TTL_SECONDS = 60
+USER_VERIFY_SECONDS = 5
+
+_users = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+_COLUMNS = [c.key for c in inspect(User).column_attrs]
+
+
+class _Entry:
+    __slots__ = ("values", "checked_at")
+
+    def __init__(self, values):
+        self.values = values                # column values of the row
+        self.checked_at = time.monotonic()  # when they were last known current
+
+
+def load_user(user_id: int):
+    """
+    Flask-Login user loader. The user's column values are cached rather
+    than the instance, and each request gets a fresh User attached to its
+    session, so it behaves like a queried one (lazy loads, changes flushed
+    on commit).
+
+    A hit makes no query. Once an entry is USER_VERIFY_SECONDS old, the
+    next hit reads User.version by primary key; any update by any worker
+    (a ban, a plan purchase, a profile edit, bulk moderation) bumps it, so
+    the row is reloaded if it changed.
+    """
+    entry = _users.get(user_id)
+    if entry is not None and time.monotonic() - entry.checked_at > USER_VERIFY_SECONDS:
+        current = db.session.execute(
+            select(User.version).where(User.id == user_id)
+        ).scalar()
+        if current == entry.values["version"]:
+            entry.checked_at = time.monotonic()
+        else:
+            invalidate_user(user_id)
+            entry = None
+    if entry is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            _users.set(user_id, _Entry({key: getattr(user, key) for key in _COLUMNS}))
+        return user
+
+    user = User(**entry.values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def invalidate_user(user_id: int):
+    _users.pop(user_id)
+
+
+def cache_stats() -> dict:
+    return _users.stats()
+
+
+# Any ORM change to a user drops this worker's cached row when it is
+# flushed, and again once it is committed, so the next request sees it
+# without waiting for the version check.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    invalidate_user(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("changed_user_ids", None)
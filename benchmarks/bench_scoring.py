@@ -0,0 +1,101 @@
+"""
+Benchmark of swipe-deck compatibility ranking (app/swipe/scoring.py).
+
+Builds a CompatibilityIndex for 50k synthetic users and times ranking every
+other user against one viewer, compared with a per-pair Python loop.
+
+    python benchmarks/bench_scoring.py [--users 50000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.swipe.scoring import (  # noqa: E402
+    CompatibilityIndex, split_tags,
+    W_INTEREST, W_LOOKING_FOR, W_BRANCH, W_YEAR,
+)
+
+INTERESTS = [
+    "hackathons", "dance", "music", "coding", "football", "cricket", "chess",
+    "photography", "gaming", "debate", "robotics", "art", "movies", "anime",
+    "startups", "fitness", "travel", "reading", "poetry", "design",
+] + [f"club{i}" for i in range(300)]
+GOALS = ["events", "dating", "friends", "study", "projects"]
+BRANCHES = ["CSE", "ECE", "ME", "CE", "EEE", "AI", "BIO", "MBA"]
+YEARS = ["1", "2", "3", "4"]
+
+
+def synthetic_rows(n, seed=42):
+    rnd = random.Random(seed)
+    for user_id in range(1, n + 1):
+        yield (
+            user_id,
+            ",".join(rnd.sample(INTERESTS, rnd.randint(0, 6))),
+            ",".join(rnd.sample(GOALS, rnd.randint(0, 2))),
+            rnd.choice(BRANCHES),
+            rnd.choice(YEARS),
+        )
+
+
+def python_rank(rows, user_id, candidate_ids):
+    """Reference per-pair implementation the vectorized version replaces."""
+    by_id = {r[0]: r for r in rows}
+    me = by_id[user_id]
+    my_interests, my_goals = set(split_tags(me[1])), set(split_tags(me[2]))
+
+    def score(cid):
+        other = by_id[cid]
+        return (
+            W_INTEREST * len(my_interests & set(split_tags(other[1])))
+            + W_LOOKING_FOR * len(my_goals & set(split_tags(other[2])))
+            + W_BRANCH * (other[3] == me[3])
+            + W_YEAR * (other[4] == me[4])
+        )
+
+    return sorted(candidate_ids, key=score, reverse=True)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.users))
+    start = time.perf_counter()
+    index = CompatibilityIndex.from_rows(rows)
+    build = time.perf_counter() - start
+
+    viewer = 1
+    candidates = [r[0] for r in rows if r[0] != viewer]
+    batch = candidates[:200]
+
+    full = timed(lambda: index.rank(viewer, candidates), args.repeat)
+    deck = timed(lambda: index.rank(viewer, batch), args.repeat)
+    loop = timed(lambda: python_rank(rows, viewer, candidates), max(args.repeat // 10, 1))
+
+    size = index.interests.nbytes + index.looking_for.nbytes + index.branch.nbytes + index.year.nbytes
+    print(f"users:                    {len(index)}")
+    print(f"index build:              {build * 1000:8.1f} ms")
+    print(f"index size:               {size / 1024:8.1f} KiB")
+    print(f"rank all candidates:      {full * 1000:8.2f} ms (vectorized)")
+    print(f"rank one deck batch(200): {deck * 1000:8.3f} ms (vectorized)")
+    print(f"rank all candidates:      {loop * 1000:8.2f} ms (python loop)")
+    print(f"speedup:                  {loop / full:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
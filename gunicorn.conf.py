@@ -0,0 +1,17 @@
+import multiprocessing
+import os
+
+# Loaded automatically by `gunicorn wsgi:app` from this directory.
+#
+# Chat rooms hold an open Server-Sent Events request for up to
+# STREAM_SECONDS (app/chat/routes.py), so requests are served by threads:
+# with the default sync worker a single open chat would occupy the whole
+# worker. Each thread holds at most one stream at a time, and a database
+# connection only while it queries.
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+
+# Idle keep-alive connections don't need a thread of their own under gthread
+keepalive = 5